@@ -1,7 +1,38 @@
 import wtforms.fields
 
 
-class MultiCheckboxField(wtforms.fields.SelectMultipleField):
+class _ItemsField(wtforms.fields.SelectMultipleField):
+    """
+    Base for fields that select multiple items by their primary key, e.g.
+    on the list view.
+
+    By default, each submitted value is checked against the ``choices`` of
+    the field using a set. If the choices do not contain all existing items
+    (for example, if only the items of the current page are known), pass a
+    ``lookup`` callable instead. It receives the list of submitted values and
+    must return a container of those values that actually exist, ideally
+    resolved with a single query such as ``pk IN (...)``.
+    """
+
+    def __init__(self, label=None, validators=None, lookup=None, **kwargs):
+        super(_ItemsField, self).__init__(label, validators, **kwargs)
+        self.lookup = lookup
+
+    def pre_validate(self, form):
+        if not self.data:
+            return
+        if self.lookup is not None:
+            values = self.lookup(self.data)
+        else:
+            values = set(c[0] for c in self.choices)
+        msg = ('One of the selected items does not exist anymore. It has '
+               'probably been deleted.')
+        for d in self.data:
+            if d not in values:
+                raise ValueError(self.gettext(msg))
+
+
+class MultiCheckboxField(_ItemsField):
     """
     A multiple-select, except displays a list of checkboxes.
 
@@ -33,22 +64,17 @@ class MultiCheckboxField(wtforms.fields.SelectMultipleField):
 
     As you can see, a list is produces instead of a scalar value which allows
     multiple fields with the same name.
+
+    Submitted values are checked against the ``choices``. If the choices do
+    not contain all valid items, pass a ``lookup`` callable instead: It
+    receives the list of submitted values and returns those that exist (see
+    :meth:`pyramid_crud.views.CRUDView._lookup_items`).
     """
     widget = wtforms.widgets.ListWidget(prefix_label=False)
     option_widget = wtforms.widgets.CheckboxInput()
 
-    def pre_validate(self, form):
-        if not self.data:
-            return
-        values = list(c[0] for c in self.choices)
-        msg = ('One of the selected items does not exist anymore. It has '
-               'probably been deleted.')
-        for d in self.data:
-            if d not in values:
-                raise ValueError(self.gettext(msg))
-
 
-class MultiHiddenField(wtforms.fields.SelectMultipleField):
+class MultiHiddenField(_ItemsField):
     """
     A field that represents a list of hidden input fields the same way as
     :class:`.MultiCheckboxField` and
@@ -57,16 +83,6 @@ class MultiHiddenField(wtforms.fields.SelectMultipleField):
     widget = wtforms.widgets.HiddenInput()
     option_widget = wtforms.widgets.HiddenInput()
 
-    def pre_validate(self, form):
-        if not self.data:
-            return
-        values = list(c[0] for c in self.choices)
-        msg = ('One of the selected items does not exist anymore. It has '
-               'probably been deleted.')
-        for d in self.data:
-            if d not in values:
-                raise ValueError(self.gettext(msg))
-
 
 class SelectField(wtforms.fields.SelectField):
     """
@@ -0,0 +1,271 @@
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm.interfaces import MANYTOONE
+from sqlalchemy.orm.properties import RelationshipProperty
+from datetime import datetime, time, timedelta
+from .util import _get_converter
+import sqlalchemy
+import six
+
+
+class Filter(object):
+    """
+    The base class of all filters of the list view (see
+    :ref:`list_filter <list_filter>`). A filter reads its value from the
+    query string and restricts the query of the list view with a ``WHERE``
+    clause. Filters do not keep any state of a request so a single instance
+    can be shared between requests.
+
+    :param name: The name of the attribute on the model that is filtered. It
+        is also the name of the parameter in the query string.
+
+    :param label: The label of the filter. By default the label from the
+        ``info`` dict of the attribute is used or the name is turned into a
+        label.
+    """
+    #: The kind of widget that templates should render for this filter,
+    #: either ``'select'`` or ``'date_range'``.
+    widget = 'select'
+
+    def __init__(self, name, label=None):
+        self.name = name
+        self._label = label
+
+    @property
+    def params(self):
+        """
+        A list of the names of the query string parameters of this filter.
+        """
+        return [self.name]
+
+    def get_label(self, model):
+        """
+        Get the label of this filter for ``model``.
+        """
+        if self._label is not None:
+            return self._label
+        info = getattr(getattr(model, self.name, None), 'info', {})
+        if 'label' in info:
+            return info['label']
+        return self.name.replace("_", " ").title()
+
+    def get_column(self, model):
+        """
+        Get the column of ``model`` that is filtered.
+        """
+        attribute = getattr(model, self.name, None)
+        prop = getattr(attribute, 'property', None)
+        columns = getattr(prop, 'columns', None)
+        if not columns:
+            raise AttributeError("No column of name '%s' on model %s found"
+                                 % (self.name, model.__name__))
+        return columns[0]
+
+    def get_value(self, model, params):
+        """
+        Get the value of this filter from ``params``.
+
+        :param params: The parameters of the query string, i.e.
+            ``request.GET``.
+
+        :return: The value or ``None`` if the filter is not active. Invalid
+            values are ignored and also return ``None``.
+        """
+        value = params.get(self.name)
+        if not value:
+            return None
+        try:
+            return _get_converter(self.get_column(model))(value)
+        except (TypeError, ValueError):
+            return None
+
+    def apply(self, query, model, value):
+        """
+        Restrict ``query`` to the items that match ``value`` which is never
+        ``None``.
+        """
+        return query.filter(self.get_column(model) == value)
+
+    def get_options(self, view):
+        """
+        Get the options of a ``select`` widget as a list of ``(value,
+        label)`` tuples. The values are strings as they appear in the query
+        string.
+        """
+        raise NotImplementedError
+
+    def get_facet_column(self, model):
+        """
+        Get the column that the list query is grouped by to count the items
+        for each option (see :ref:`list_facets <list_facets>`) or ``None``
+        if this filter has no facets.
+        """
+        return self.get_column(model)
+
+    def format_value(self, value):
+        """
+        Turn a value of the column into the option value as it appears in
+        the query string.
+        """
+        return six.text_type(value)
+
+
+class BooleanFilter(Filter):
+    """
+    A filter that selects items with a true or false value in a boolean
+    column. The value ``1`` in the query string selects true values and
+    ``0`` selects false values.
+    """
+
+    def get_value(self, model, params):
+        return {'1': True, '0': False}.get(params.get(self.name))
+
+    def format_value(self, value):
+        return '1' if value else '0'
+
+    def get_options(self, view):
+        return [('1', 'Yes'), ('0', 'No')]
+
+
+class ChoiceFilter(Filter):
+    """
+    A filter that selects items with a specific value in a column.
+
+    :param choices: A list of ``(value, label)`` tuples to choose from. If it
+        is not given, the ``choices`` in the ``info`` dict of the column or
+        the values of an :class:`sqlalchemy.types.Enum` are used. Otherwise
+        all values that actually occur are loaded with a single ``SELECT
+        DISTINCT`` query.
+    """
+
+    def __init__(self, name, label=None, choices=None):
+        super(ChoiceFilter, self).__init__(name, label)
+        self.choices = choices
+
+    def get_options(self, view):
+        model = view.Form.Meta.model
+        column = self.get_column(model)
+        choices = self.choices
+        if choices is None:
+            choices = column.info.get('choices')
+        if choices is None and isinstance(column.type, sqlalchemy.Enum):
+            choices = [(value, value) for value in column.type.enums]
+        if choices is None:
+            query = (view.dbsession.query(column).
+                     filter(column.isnot(None)).
+                     distinct().
+                     order_by(column))
+            choices = [(value, value) for value, in query]
+        return [(six.text_type(value), six.text_type(label))
+                for value, label in choices]
+
+
+class DateRangeFilter(Filter):
+    """
+    A filter that selects items with a date within a range. It uses the two
+    parameters ``<name>__gte`` and ``<name>__lte`` in the query string that
+    hold the first and last day (both inclusive) in the format
+    ``YYYY-MM-DD``. Either of them may be omitted. On columns that include a
+    time, the whole last day is included.
+    """
+    widget = 'date_range'
+
+    @property
+    def params(self):
+        return [self.name + '__gte', self.name + '__lte']
+
+    def get_options(self, view):
+        return []
+
+    def get_facet_column(self, model):
+        return None
+
+    def get_value(self, model, params):
+        values = []
+        for param in self.params:
+            try:
+                value = datetime.strptime(params.get(param, ''), '%Y-%m-%d')
+            except ValueError:
+                value = None
+            else:
+                value = value.date()
+            values.append(value)
+        if values == [None, None]:
+            return None
+        return tuple(values)
+
+    def apply(self, query, model, value):
+        start, end = value
+        column = self.get_column(model)
+        with_time = isinstance(column.type, sqlalchemy.DateTime)
+        if start is not None:
+            if with_time:
+                start = datetime.combine(start, time())
+            query = query.filter(column >= start)
+        if end is not None:
+            if with_time:
+                end = datetime.combine(end + timedelta(days=1), time())
+                query = query.filter(column < end)
+            else:
+                query = query.filter(column <= end)
+        return query
+
+
+class RelationshipFilter(Filter):
+    """
+    A filter on a relationship to a single object (i.e. a foreign key).
+    The value in the query string is the primary key of the related object.
+    Only related objects that are actually referenced are offered as options
+    which are loaded with a single query.
+    """
+
+    def _get_relationship(self, model):
+        attribute = getattr(model, self.name, None)
+        prop = getattr(attribute, 'property', None)
+        if (not isinstance(prop, RelationshipProperty) or
+                prop.direction is not MANYTOONE or
+                len(prop.local_columns) != 1):
+            raise AttributeError("No relationship to a single object of name "
+                                 "'%s' on model %s found"
+                                 % (self.name, model.__name__))
+        return prop
+
+    def get_column(self, model):
+        [column] = self._get_relationship(model).local_columns
+        return column
+
+    def get_options(self, view):
+        model = view.Form.Meta.model
+        prop = self._get_relationship(model)
+        [local] = prop.local_columns
+        remote = prop.local_remote_pairs[0][1]
+        key = prop.mapper.get_property_by_column(remote).key
+        referenced = view.dbsession.query(local).distinct()
+        query = (view.dbsession.query(prop.mapper).
+                 filter(remote.in_(referenced.subquery())).
+                 order_by(remote))
+        return [(six.text_type(getattr(obj, key)), six.text_type(obj))
+                for obj in query]
+
+
+def get_filter(model, name):
+    """
+    Create the filter that fits the attribute ``name`` of ``model`` best:
+    A :class:`RelationshipFilter` for relationships, a
+    :class:`BooleanFilter` for boolean columns, a :class:`DateRangeFilter`
+    for date and datetime columns and a :class:`ChoiceFilter` for all other
+    columns.
+    """
+    mapper = inspect(model)
+    if name in mapper.relationships:
+        filter_ = RelationshipFilter(name)
+        filter_.get_column(model)
+        return filter_
+    if name not in mapper.column_attrs:
+        raise AttributeError("No column or relationship of name '%s' on "
+                             "model %s found" % (name, model.__name__))
+    column = mapper.column_attrs[name].columns[0]
+    if isinstance(column.type, sqlalchemy.Boolean):
+        return BooleanFilter(name)
+    if isinstance(column.type, (sqlalchemy.Date, sqlalchemy.DateTime)):
+        return DateRangeFilter(name)
+    return ChoiceFilter(name)
@@ -0,0 +1,604 @@
+from pyramid.decorator import reify
+from sqlalchemy import (and_, or_, tuple_, text, case, false, literal,
+                        Column)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.inspection import inspect
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+import base64
+import binascii
+import json
+import six
+try:
+    import enum
+except ImportError:  # pragma: no cover
+    enum = None
+from .util import TTLCache, iter_batches, split
+
+
+class SortKey(namedtuple('SortKey', 'expression descending getter')):
+    """
+    A single ordering criterion of the list view.
+
+    :param expression: The column or SQL expression to order by.
+
+    :param descending: Whether to order descending instead of ascending.
+
+    :param getter: A callable that receives a single listed item and returns
+        its value for ``expression``. It is used to create the cursors of
+        :class:`KeysetPage`.
+    """
+    __slots__ = ()
+
+    @property
+    def clause(self):
+        """
+        The clause suitable for :meth:`sqlalchemy.orm.query.Query.order_by`.
+        """
+        if self.descending:
+            return self.expression.desc()
+        return self.expression.asc()
+
+
+class ExactCount(object):
+    """
+    The default count strategy that counts the items with ``COUNT(*)`` on
+    every request.
+
+    A count strategy is a callable that receives the query of the list view
+    and returns a tuple of the number of items and whether this number is
+    exact (see :ref:`list_count <list_count>`).
+    """
+
+    def __call__(self, query):
+        return query.order_by(None).count(), True
+
+
+class CachedCount(object):
+    """
+    A count strategy that caches the exact count for ``ttl`` seconds. The
+    cache is keyed by the SQL of the query and its parameters, so each
+    combination of filters and search terms is cached separately.
+
+    :param ttl: The number of seconds the count is cached.
+
+    :param maxsize: The maximum number of cached counts.
+    """
+
+    def __init__(self, ttl=60, maxsize=128):
+        self.ttl = ttl
+        self.cache = TTLCache(maxsize)
+
+    def __call__(self, query):
+        query = query.order_by(None)
+        compiled = query.statement.compile()
+        key = (six.text_type(compiled),
+               tuple(sorted(compiled.params.items())))
+        try:
+            count = self.cache.get(key)
+        except TypeError:
+            # Parameters that cannot be hashed are not cached
+            return query.count(), True
+        if count is None:
+            count = query.count()
+            self.cache.set(key, count, self.ttl)
+        return count, True
+
+
+class ApproximateCount(object):
+    """
+    A count strategy that uses the statistics of the database instead of
+    counting. They are available without scanning the table but may be
+    out of date. The statistics are used on PostgreSQL
+    (``pg_class.reltuples``), MySQL (``information_schema.tables``) and
+    SQLite (``sqlite_stat1``, which requires running ``ANALYZE``).
+
+    The estimate covers the whole table, so it is only used if the query is
+    not filtered and the estimate is at least ``threshold``. Otherwise,
+    ``fallback`` is used.
+
+    :param threshold: The minimum number of rows for which the estimate is
+        used. Below this, counting is fast enough.
+
+    :param fallback: The count strategy to use when no estimate is used.
+        Defaults to :class:`ExactCount`.
+    """
+    _queries = {
+        # to_regclass returns NULL for unknown tables instead of failing,
+        # which would abort the transaction of the request
+        'postgresql': "SELECT reltuples FROM pg_class "
+                      "WHERE oid = to_regclass(:table)",
+        'mysql': "SELECT table_rows FROM information_schema.tables "
+                 "WHERE table_schema = DATABASE() AND table_name = :table",
+        'sqlite': "SELECT stat FROM sqlite_stat1 WHERE tbl = :table",
+    }
+
+    def __init__(self, threshold=100000, fallback=None):
+        self.threshold = threshold
+        if fallback is None:
+            fallback = ExactCount()
+        self.fallback = fallback
+
+    def estimate(self, query):
+        """
+        Get the estimated number of rows of the table of the items of
+        ``query`` or ``None`` if there is no estimate.
+        """
+        model = query.column_descriptions[0]['entity']
+        table = inspect(model).local_table
+        bind = query.session.get_bind(mapper=inspect(model))
+        sql = self._queries.get(bind.dialect.name)
+        if sql is None:
+            return None
+        name = self.get_table_name(table, bind.dialect)
+        try:
+            value = query.session.execute(text(sql), {'table': name},
+                                          mapper=inspect(model)).scalar()
+        except DBAPIError:
+            return None
+        if value is None:
+            return None
+        if isinstance(value, six.string_types):
+            # sqlite_stat1 starts with the number of rows
+            value = value.split()[0]
+        return int(float(value))
+
+    def get_table_name(self, table, dialect):
+        """
+        Get the name of ``table`` as it is looked up in the statistics of
+        ``dialect``. On PostgreSQL this is the quoted name including the
+        schema as expected by ``to_regclass``, e.g. ``"Users"`` or
+        ``app."Users"``. Otherwise it is just the name of the table.
+        """
+        if dialect.name == 'postgresql':
+            return dialect.identifier_preparer.format_table(table)
+        return table.name
+
+    def __call__(self, query):
+        if query.whereclause is None:
+            estimate = self.estimate(query)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate, False
+        return self.fallback(query)
+
+
+class Page(object):
+    """
+    A single page of a list query. The page is selected in the database by
+    applying ``LIMIT`` and ``OFFSET`` to the query so only the rows actually
+    displayed are ever loaded.
+
+    :param query: The query to paginate. It should already be ordered in a
+        deterministic way (e.g. with the primary keys as the last ordering
+        criterion) or the rows on subsequent pages are not stable.
+
+    :param page: The number of the page to display, starting at ``1``.
+
+    :param per_page: The maximum number of items on a single page. If this is
+        ``None``, pagination is disabled and there is a single page containing
+        all items.
+
+    :param process: An optional callable that receives the list of rows
+        loaded from the database and returns the list of items. This allows
+        queries that select additional columns next to the items.
+
+    :param count: The count strategy used for :attr:`item_count`, e.g.
+        :class:`ExactCount` which is the default.
+    """
+
+    def __init__(self, query, page=1, per_page=None, process=None,
+                 count=None):
+        self.query = query
+        self.page = page
+        self.per_page = per_page
+        self.process = process
+        if count is None:
+            count = ExactCount()
+        self.count = count
+
+    @reify
+    def items(self):
+        """
+        A list of the items on this page. They are loaded once so that
+        everything displaying this page can share them without querying the
+        database again.
+        """
+        items = self._get_page_query().all()
+        if self.process is not None:
+            items = self.process(items)
+        return items
+
+    def _get_page_query(self):
+        query = self.query
+        if self.per_page is not None:
+            offset = (self.page - 1) * self.per_page
+            query = query.limit(self.per_page).offset(offset)
+        return query
+
+    def iter_batches(self, size):
+        """
+        Iterate over the items of this page in lists of at most ``size``
+        items. Unless :attr:`items` have been loaded already, the rows are
+        fetched from the cursor while iterating (see
+        :func:`.util.iter_batches`), so the first batch is available before
+        the whole page is loaded. The items of each batch are removed from
+        the session once the next batch is requested.
+        """
+        if 'items' in self.__dict__:
+            for batch in split(self.items, size):
+                yield batch
+            return
+        for batch in iter_batches(self._get_page_query(), size):
+            if self.process is not None:
+                batch = self.process(batch)
+            yield batch
+
+    @reify
+    def _item_count(self):
+        return self.count(self.query)
+
+    @property
+    def item_count(self):
+        """
+        The total number of items on all pages as determined by the count
+        strategy. It might only be an estimate, see
+        :attr:`item_count_exact`.
+        """
+        return self._item_count[0]
+
+    @property
+    def item_count_exact(self):
+        """
+        Whether :attr:`item_count` is exact and not just an estimate.
+        """
+        return self._item_count[1]
+
+    @reify
+    def page_count(self):
+        """
+        The number of available pages, always at least ``1``.
+        """
+        if self.per_page is None:
+            return 1
+        return max(1, (self.item_count + self.per_page - 1) // self.per_page)
+
+    @property
+    def has_previous(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.page_count
+
+    @property
+    def previous_page(self):
+        return self.page - 1 if self.has_previous else None
+
+    @property
+    def next_page(self):
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def previous_params(self):
+        """
+        The query string parameters that lead to the previous page or
+        ``None`` if there is no previous page.
+        """
+        if not self.has_previous:
+            return None
+        return {'page': self.previous_page}
+
+    @property
+    def next_params(self):
+        """
+        The query string parameters that lead to the next page or ``None`` if
+        there is no next page.
+        """
+        if not self.has_next:
+            return None
+        return {'page': self.next_page}
+
+    def iter_pages(self, window=2):
+        """
+        Iterate over the page numbers to be displayed as links. The first and
+        last page as well as ``window`` pages around the current page are
+        returned. Each gap between those numbers is represented by a single
+        ``None``.
+        """
+        last = None
+        for page in range(1, self.page_count + 1):
+            if (page == 1 or page == self.page_count or
+                    abs(page - self.page) <= window):
+                if last is not None and page - last > 1:
+                    yield None
+                yield page
+                last = page
+
+
+class KeysetPage(object):
+    """
+    A single page of a list query using keyset (or cursor) pagination.
+    Instead of skipping rows with ``OFFSET``, the page starts after the last
+    row of the previous page by filtering on the ordering criteria, for
+    example ``WHERE (sort_col, pk) > (:last_sort, :last_pk)``. Thus, every
+    page is as cheap as the first one. However, it is not possible to jump to
+    an arbitrary page, only to the previous or next one.
+
+    :param query: The query to paginate. Any ordering present on it is
+        replaced by the ordering from ``keys``.
+
+    :param keys: A list of :class:`SortKey` instances. The combination of all
+        keys must be unique for each row, so the primary keys should always be
+        the last keys.
+
+    :param per_page: The maximum number of items on a single page. If this is
+        ``None``, pagination is disabled and all items are on a single page.
+
+    :param cursor: An opaque token as returned by :attr:`previous_params` or
+        :attr:`next_params`. If it is ``None`` or invalid, the first page is
+        displayed.
+
+    :param process: An optional callable that receives the list of rows
+        loaded from the database and returns the list of items, see
+        :class:`Page`.
+
+    Keys that may be ``NULL`` (all but plain columns that are ``NOT NULL``)
+    are ordered with ``NULL`` values after all others in ascending order and
+    before them in descending order, regardless of the database, so that the
+    cursor can continue after them.
+
+    .. note::
+
+        Values are encoded as JSON in the cursor. Dates, datetimes, times,
+        intervals and Python enums are supported in addition to the JSON
+        types but time zones are not preserved. Any other value (e.g. a
+        decimal or UUID) is stored as a string and converted back with the
+        ``python_type`` of its column, so this must accept the string.
+    """
+
+    def __init__(self, query, keys, per_page=None, cursor=None,
+                 process=None):
+        self.query = query
+        self.keys = keys
+        self.per_page = per_page
+        self.process = process
+        self.backwards, self.values = self._decode_cursor(cursor)
+
+    @reify
+    def _result(self):
+        query = self.query.order_by(None)
+        order = []
+        for key in self._keys(self.backwards):
+            if _is_nullable(key.expression):
+                # Sort NULL as the largest value on all databases
+                is_null = case([(key.expression.is_(None), 1)], else_=0)
+                order.append(is_null.desc() if key.descending
+                             else is_null.asc())
+            order.append(key.clause)
+        query = query.order_by(*order)
+        if self.values is not None:
+            query = query.filter(self._after(self.values, self.backwards))
+        if self.per_page is None:
+            items, more = query.all(), False
+        else:
+            # Fetch a single additional row to know whether there are more
+            items = query.limit(self.per_page + 1).all()
+            more = len(items) > self.per_page
+            items = items[:self.per_page]
+            if self.backwards:
+                items.reverse()
+        if self.process is not None:
+            items = self.process(items)
+        return items, more
+
+    @property
+    def items(self):
+        """
+        A list of the items on this page.
+        """
+        return self._result[0]
+
+    def iter_batches(self, size):
+        """
+        Iterate over the items of this page in lists of at most ``size``
+        items. As the navigation depends on the items, the page is always
+        loaded completely.
+        """
+        return split(self.items, size)
+
+    @property
+    def has_previous(self):
+        if self.backwards:
+            return self._result[1]
+        return self.values is not None
+
+    @property
+    def has_next(self):
+        if self.backwards:
+            return True
+        return self._result[1]
+
+    @property
+    def previous_params(self):
+        """
+        The query string parameters that lead to the previous page or
+        ``None`` if there is no previous page.
+        """
+        if not self.has_previous or not self.items:
+            return None
+        return {'cursor': self._encode_cursor(self.items[0], True)}
+
+    @property
+    def next_params(self):
+        """
+        The query string parameters that lead to the next page or ``None`` if
+        there is no next page.
+        """
+        if not self.has_next or not self.items:
+            return None
+        return {'cursor': self._encode_cursor(self.items[-1], False)}
+
+    def iter_pages(self, window=2):
+        """
+        Keyset pagination does not know about page numbers so this never
+        yields anything.
+        """
+        return iter(())
+
+    def _keys(self, backwards):
+        for key in self.keys:
+            if backwards:
+                key = key._replace(descending=not key.descending)
+            yield key
+
+    def _after(self, values, backwards):
+        keys = list(self._keys(backwards))
+        directions = set(key.descending for key in keys)
+        nullable = any(_is_nullable(key.expression) for key in keys)
+        if len(directions) == 1 and not nullable:
+            # All keys in the same direction can use a row value comparison
+            # which databases can answer directly from a matching index.
+            columns = tuple_(*[key.expression for key in keys])
+            bound = tuple_(*[_literal(key, value)
+                             for key, value in zip(keys, values)])
+            if directions.pop():
+                return columns < bound
+            return columns > bound
+
+        # NULL is sorted as the largest value, see _result
+        clauses = []
+        for index, key in enumerate(keys):
+            equal = [prev.expression.is_(None) if value is None
+                     else prev.expression == _literal(prev, value)
+                     for prev, value in zip(keys[:index], values[:index])]
+            value = values[index]
+            if key.descending:
+                if value is None:
+                    compare = key.expression.isnot(None)
+                else:
+                    compare = key.expression < _literal(key, value)
+            elif value is None:
+                compare = false()
+            else:
+                compare = key.expression > _literal(key, value)
+                if _is_nullable(key.expression):
+                    compare = or_(compare, key.expression.is_(None))
+            clauses.append(and_(*(equal + [compare])))
+        return or_(*clauses)
+
+    def _encode_cursor(self, item, backwards):
+        values = [_encode_value(key.getter(item)) for key in self.keys]
+        data = json.dumps({'b': backwards, 'v': values},
+                          separators=(',', ':'))
+        token = base64.urlsafe_b64encode(data.encode('utf-8'))
+        return token.decode('ascii').rstrip('=')
+
+    def _decode_cursor(self, cursor):
+        if not cursor:
+            return False, None
+        try:
+            token = cursor + '=' * (-len(cursor) % 4)
+            data = base64.urlsafe_b64decode(token.encode('ascii'))
+            data = json.loads(data.decode('utf-8'))
+            if not isinstance(data['v'], list):
+                raise ValueError("Invalid values")
+            values = [_decode_value(key.expression, value)
+                      for key, value in zip(self.keys, data['v'])]
+            if len(values) != len(self.keys):
+                raise ValueError("Invalid number of values")
+            return bool(data['b']), values
+        except (binascii.Error, KeyError, TypeError, ValueError,
+                UnicodeError):
+            return False, None
+
+
+def _literal(key, value):
+    # A bind typed like the key, plain values such as booleans are not
+    # allowed in comparisons other than equality
+    return literal(value, getattr(key.expression, 'type', None))
+
+
+def _is_nullable(expression):
+    column = getattr(expression, 'expression', expression)
+    return not isinstance(column, Column) or column.nullable
+
+
+_json_scalars = (bool, float) + six.integer_types + six.string_types
+
+
+def _encode_value(value):
+    if value is None or isinstance(value, _json_scalars):
+        return value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if enum is not None and isinstance(value, enum.Enum):
+        return value.name
+    # Anything else (e.g. decimals or UUIDs) is converted back from its
+    # string by the Python type of the column, see _decode_value
+    return six.text_type(value)
+
+
+_datetime_formats = ['%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S']
+_time_formats = ['%H:%M:%S.%f', '%H:%M:%S']
+
+
+def _parse(value, formats):
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError("Invalid value %s" % value)
+
+
+def _decode_value(expression, value):
+    # Only values that the cursor was created from are valid, anything else
+    # is rejected before it gets bound to the query.
+    if value is None:
+        return value
+    if not isinstance(value, _json_scalars):
+        raise ValueError("Invalid value %r" % (value,))
+    try:
+        python_type = expression.type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+    numeric = six.integer_types + (float, Decimal)
+    if not isinstance(value, six.string_types):
+        if isinstance(value, bool):
+            valid = python_type is bool
+        elif python_type is timedelta:
+            return timedelta(seconds=value)
+        elif isinstance(value, float):
+            valid = python_type in (float, Decimal)
+        else:
+            valid = python_type in numeric
+        if not valid:
+            raise ValueError("Invalid value %r" % (value,))
+        return value
+    if python_type is datetime:
+        return _parse(value[:26], _datetime_formats)
+    if python_type is date:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if python_type is time:
+        return _parse(value[:15], _time_formats).time()
+    if python_type is Decimal:
+        try:
+            return Decimal(value)
+        except ArithmeticError:
+            raise ValueError("Invalid decimal %s" % value)
+    if issubclass(python_type, six.string_types):
+        return value
+    if python_type in numeric + (bool, timedelta):
+        raise ValueError("Invalid value %r" % (value,))
+    if enum is not None and issubclass(python_type, enum.Enum):
+        try:
+            return python_type[value]
+        except KeyError:
+            raise ValueError("Invalid value %r" % (value,))
+    try:
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid value %r" % (value,))
@@ -0,0 +1,214 @@
+from sqlalchemy import event, func, or_, select, literal_column, DDL
+from sqlalchemy.inspection import inspect
+from sqlalchemy.sql import table, column
+from .util import get_pk_info
+import six
+import weakref
+
+
+class SearchBackend(object):
+    """
+    The base class of all search backends (see
+    :ref:`search_backend <search_backend>`). A backend turns a search term
+    into a ``WHERE`` clause of the list query. Backends do not keep any
+    state of a request so a single instance can be shared between views.
+    """
+
+    def setup(self, model, fields):
+        """
+        Prepare the backend for searching ``fields`` on ``model``. This is
+        called once for each view class that defines
+        :ref:`search_fields <search_fields>`, when the class is created. By
+        default this does nothing.
+        """
+
+    def apply(self, query, model, fields, term):
+        """
+        Restrict ``query`` to the items that match ``term``.
+
+        :param fields: A tuple of names of the columns that are searched.
+
+        :param term: The search term as entered by the user. It is never
+            empty.
+        """
+        raise NotImplementedError
+
+
+def _escape_like(value):
+    for char in ('\\', '%', '_'):
+        value = value.replace(char, '\\' + char)
+    return value
+
+
+class LikeSearch(SearchBackend):
+    """
+    The default backend that searches with ``LIKE``. The term is split into
+    words and each word must be contained (case-insensitive) in at least one
+    of the fields. This works on all databases but cannot use an index, so
+    every search scans the whole table.
+    """
+
+    def apply(self, query, model, fields, term):
+        columns = [getattr(model, field) for field in fields]
+        for word in term.split():
+            pattern = '%' + _escape_like(word) + '%'
+            query = query.filter(or_(*[col.ilike(pattern, escape='\\')
+                                       for col in columns]))
+        return query
+
+
+class PostgresSearch(SearchBackend):
+    """
+    Use the full text search of PostgreSQL. The term is converted with
+    ``plainto_tsquery`` and matched against a ``tsvector``.
+
+    :param config: The text search configuration, e.g. ``'english'``.
+
+    :param vector: The name of a ``tsvector`` column on the model (e.g. a
+        generated column with a ``GIN`` index). If it is not given, the
+        vector is computed from the fields with ``to_tsvector``, which can
+        be served by an expression index on exactly that expression:
+
+        .. code-block:: sql
+
+            CREATE INDEX ON post USING GIN
+                (to_tsvector('english', concat_ws(' ', title, body)));
+    """
+
+    def __init__(self, config='english', vector=None):
+        self.config = config
+        self.vector = vector
+
+    def get_vector(self, model, fields):
+        """
+        Get the ``tsvector`` expression that is searched.
+        """
+        if self.vector is not None:
+            return getattr(model, self.vector)
+        columns = [getattr(model, field) for field in fields]
+        return func.to_tsvector(self.config, func.concat_ws(' ', *columns))
+
+    def apply(self, query, model, fields, term):
+        tsquery = func.plainto_tsquery(self.config, term)
+        vector = self.get_vector(model, fields)
+        return query.filter(vector.op('@@')(tsquery))
+
+
+class SQLiteFTSSearch(SearchBackend):
+    """
+    Use an SQLite FTS5 table that holds a copy of the searched fields. The
+    table is named after the table of the model with a ``_fts`` suffix and
+    its ``rowid`` is the primary key of the model, which must be a single
+    integer column. It is created together with the table of the model
+    (e.g. by :meth:`sqlalchemy.schema.MetaData.create_all`) and kept in sync
+    by listening to the ``after_insert``, ``after_update`` and
+    ``after_delete`` events of the model.
+
+    Each word of the term matches all words starting with it and all words
+    must be found.
+
+    .. note::
+
+        Changes that bypass the ORM, e.g. bulk updates with
+        :meth:`sqlalchemy.orm.query.Query.update`, are not seen by the
+        events. Call :meth:`rebuild` after such changes or when adding search
+        to an existing table (after :meth:`create`).
+    """
+
+    def __init__(self):
+        self._fields = weakref.WeakKeyDictionary()
+
+    def get_table_name(self, model):
+        """
+        Get the name of the FTS5 table for ``model``.
+        """
+        return inspect(model).local_table.name + '_fts'
+
+    def setup(self, model, fields):
+        fields = tuple(fields)
+        if model in self._fields:
+            if self._fields[model] != fields:
+                raise ValueError("Model %s is already searched on different "
+                                 "fields" % model.__name__)
+            return
+        pk_info = get_pk_info(model)
+        if (len(pk_info.columns) != 1 or
+                not issubclass(pk_info.columns[0].type.python_type,
+                               six.integer_types)):
+            raise ValueError("Full text search requires a single integer "
+                             "primary key on model %s" % model.__name__)
+        self._fields[model] = fields
+        event.listen(inspect(model).local_table, 'after_create',
+                     DDL(self._get_ddl(model)))
+        event.listen(model, 'after_insert', self._after_insert)
+        event.listen(model, 'after_update', self._after_update)
+        event.listen(model, 'after_delete', self._after_delete)
+
+    def _get_ddl(self, model):
+        return ("CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(%s)"
+                % (self.get_table_name(model),
+                   ", ".join(self._fields[model])))
+
+    def _get_table(self, model):
+        return table(self.get_table_name(model), column('rowid'),
+                     *[column(field) for field in self._fields[model]])
+
+    def create(self, bind, model):
+        """
+        Create the FTS5 table for ``model`` if it does not exist yet.
+
+        :param bind: An engine or connection.
+        """
+        bind.execute(self._get_ddl(model))
+
+    def rebuild(self, bind, model):
+        """
+        Replace the content of the FTS5 table of ``model`` with the current
+        rows of its table.
+
+        :param bind: An engine or connection.
+        """
+        fts = self._get_table(model)
+        columns = [getattr(model, field) for field in self._fields[model]]
+        [pk] = get_pk_info(model).columns
+        bind.execute(fts.delete())
+        source = select([pk] + columns)
+        bind.execute(fts.insert().from_select(list(fts.c), source))
+
+    def _get_values(self, model, target):
+        names = get_pk_info(model).names
+        values = {'rowid': getattr(target, names[0])}
+        for field in self._fields[model]:
+            values[field] = getattr(target, field)
+        return values
+
+    def _after_insert(self, mapper, connection, target):
+        model = mapper.class_
+        fts = self._get_table(model)
+        connection.execute(fts.insert(), self._get_values(model, target))
+
+    def _after_update(self, mapper, connection, target):
+        self._after_delete(mapper, connection, target)
+        self._after_insert(mapper, connection, target)
+
+    def _after_delete(self, mapper, connection, target):
+        model = mapper.class_
+        fts = self._get_table(model)
+        rowid = self._get_values(model, target)['rowid']
+        connection.execute(fts.delete().where(fts.c.rowid == rowid))
+
+    def _get_match(self, term):
+        # Quote each word so no FTS5 syntax can be injected
+        words = ['"%s"*' % word.replace('"', '""') for word in term.split()]
+        return ' '.join(words)
+
+    def apply(self, query, model, fields, term):
+        match = self._get_match(term)
+        if not match:
+            return query
+        name = self.get_table_name(model)
+        fts = self._get_table(model)
+        matching = select([fts.c.rowid]).where(
+            literal_column(name).op('MATCH')(match))
+        [pk] = get_pk_info(model).columns
+        return query.filter(pk.in_(matching))
@@ -1,4 +1,40 @@
 <%inherit file="${context.get('view').get_template_for('base')}" />
+<%def name="list_rows(items, checkboxes)">
+    % for item, checkbox in zip(items, checkboxes):
+        <tr>
+            <td>
+                ${checkbox()}
+            </td>
+            % for title, col in view.iter_list_cols(item):
+                % if col is True or col is False:
+                    <td class="text-${'success' if col else 'danger'} text-center">
+                % else:
+                    <td>
+                % endif
+                    % if loop.index in view._list_links:
+                        <a href="${view._edit_route(item)}">
+                            % if col is True:
+                                Yes
+                            % elif col is False:
+                                No
+                            % else:
+                                ${col}
+                            % endif
+                        </a>
+                    % else:
+                        % if col is True:
+                            Yes
+                        % elif col is False:
+                            No
+                        % else:
+                            ${col}
+                        % endif
+                    % endif
+                </td>
+            % endfor
+        </tr>
+    % endfor
+</%def>
 <%block name="head">
     <script src="${request.static_url('pyramid_crud:static/list.js')}"></script>
 </%block>
@@ -6,6 +42,39 @@
     <h1>${view.Form.title_plural}</h1>
 </%block>
 <a href="${request.route_url(view.routes['new'])}" class="btn btn-primary pull-right">New</a>
+% for format_ in view.list_export:
+    <a href="${view._export_route(format_)}" class="btn btn-default pull-right list-export">${format_.upper()}</a>
+% endfor
+% if view.list_filter or view.search_fields:
+    <form method="GET" class="form-inline list-filter">
+        % if request.GET.get('order'):
+            <input type="hidden" name="order" value="${request.GET['order']}">
+        % endif
+        % if view.search_fields:
+            <div class="form-group">
+                <input type="search" name="q" value="${request.GET.get('q', '')}" placeholder="Search" class="form-control">
+            </div>
+        % endif
+        % for filter_, label, values, options in view.iter_list_filters():
+            <div class="form-group">
+                <label for="filter-${filter_.name}">${label}</label>
+                % if filter_.widget == 'date_range':
+                    <input type="date" id="filter-${filter_.name}" name="${filter_.params[0]}" value="${values[0]}" class="form-control">
+                    &ndash;
+                    <input type="date" name="${filter_.params[1]}" value="${values[1]}" class="form-control">
+                % else:
+                    <select id="filter-${filter_.name}" name="${filter_.params[0]}" class="form-control">
+                        <option value="">All</option>
+                        % for value, option_label, count in options:
+                            <option value="${value}"${' selected' if value == values[0] else ''}>${option_label}${' (%d)' % count if count is not None else ''}</option>
+                        % endfor
+                    </select>
+                % endif
+            </div>
+        % endfor
+        <button type="submit" class="btn btn-default">${'Filter' if view.list_filter else 'Search'}</button>
+    </form>
+% endif
 <form method="POST" class="form-inline">
     <div class="form-group">
         ${action_form.action(class_='form-control')}
@@ -16,48 +85,60 @@
             <tr>
                 <th></th>
                 % for col_info in view.iter_head_cols():
+                    <% order = view._get_column_order(loop.index) %>
                     <th class="${col_info["css_class"]}">
-                        ${col_info["label"]}
+                        % if order:
+                            <a href="${order[0]}">${col_info["label"]}</a>
+                            % if order[1] == 'asc':
+                                <span class="glyphicon glyphicon-sort-by-attributes"></span>
+                            % elif order[1] == 'desc':
+                                <span class="glyphicon glyphicon-sort-by-attributes-alt"></span>
+                            % endif
+                        % else:
+                            ${col_info["label"]}
+                        % endif
                     </th>
                 % endfor
             </tr>
         </thead>
         <tbody>
-                % for item, checkbox in zip(items, action_form.items):
-                    <tr>
-                        <td>
-                            ${checkbox()}
-                        </td>
-                        % for title, col in view.iter_list_cols(item):
-                            % if col is True or col is False:
-                                <td class="text-${'success' if col else 'danger'} text-center">
-                            % else:
-                                <td>
-                            % endif
-                                % if title in getattr(view, 'list_display_links', []) or not hasattr(view, 'list_display_links') and loop.first:
-                                    <a href="${view._edit_route(item)}">
-                                        % if col is True:
-                                            Yes
-                                        % elif col is False:
-                                            No
-                                        % else:
-                                            ${col}
-                                        % endif
-                                    </a>
-                                % else:
-                                    % if col is True:
-                                        Yes
-                                    % elif col is False:
-                                        No
-                                    % else:
-                                        ${col}
-                                    % endif
-                                % endif
-                            </td>
-                        % endfor
-                    </tr>
-                % endfor
+            % if context.get('stream_marker'):
+                ${context.get('stream_marker') | n}
+            % else:
+                ${list_rows(items, action_form.items)}
+            % endif
         </tbody>
     </table>
     ${action_form.csrf_token}
 </form>
+% if page.previous_params or page.next_params:
+    % if hasattr(page, 'item_count'):
+        <p class="list-count text-muted">
+            % if not page.item_count_exact:
+                about
+            % endif
+            ${'{:,}'.format(page.item_count)} items
+        </p>
+    % endif
+    <ul class="pagination">
+        % if page.previous_params:
+            <li><a href="${view._list_route(**page.previous_params)}">&laquo;</a></li>
+        % else:
+            <li class="disabled"><span>&laquo;</span></li>
+        % endif
+        % for number in page.iter_pages():
+            % if number is None:
+                <li class="disabled"><span>&hellip;</span></li>
+            % elif number == page.page:
+                <li class="active"><span>${number}</span></li>
+            % else:
+                <li><a href="${view._list_route(page=number)}">${number}</a></li>
+            % endif
+        % endfor
+        % if page.next_params:
+            <li><a href="${view._list_route(**page.next_params)}">&raquo;</a></li>
+        % else:
+            <li class="disabled"><span>&raquo;</span></li>
+        % endif
+    </ul>
+% endif
@@ -1,25 +1,251 @@
+from sqlalchemy import event
 from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import Mapper
+from sqlalchemy.orm.interfaces import MANYTOONE
+from sqlalchemy.orm.state import InstanceState
 from sqlalchemy.orm.properties import ColumnProperty
+from collections import namedtuple
+from decimal import Decimal
+import itertools
+import six
+import threading
+import time
+import weakref
+try:
+    from collections import OrderedDict
+except ImportError:  # pragma: no cover
+    from ordereddict import OrderedDict
+
+
+PrimaryKeyInfo = namedtuple('PrimaryKeyInfo', 'names columns converters')
+"""
+Information about the primary keys of a model as returned by
+:func:`get_pk_info`. Each attribute is a tuple with one entry per primary key
+in the same order:
+
+names
+    The attribute names of the primary keys on the model.
+
+columns
+    The :class:`sqlalchemy.schema.Column` objects of the primary keys.
+
+converters
+    Callables that convert a primary key value given as a string (e.g. from a
+    URL or form) into the type of the column. They raise :exc:`ValueError` or
+    :exc:`TypeError` for invalid values. For non-numeric columns the value is
+    returned unchanged as the database is expected to handle the conversion.
+"""
+
+_pk_info_cache = weakref.WeakKeyDictionary()
+
+
+@event.listens_for(Mapper, 'mapper_configured')
+def _invalidate_pk_info(mapper, class_):
+    _pk_info_cache.pop(mapper, None)
+
+
+def _identity(value):
+    return value
+
+
+def _get_converter(column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return _identity
+    if python_type in six.integer_types + (float, Decimal):
+        return python_type
+    return _identity
+
+
+def get_pk_info(model):
+    """
+    Get information on the primary keys of a model as a
+    :class:`PrimaryKeyInfo`. The result is computed only once per mapper and
+    then cached until the mapper is configured again, so this is cheap enough
+    to be called for every row that is displayed.
+
+    :param model: A model for which to search the keys.
+    """
+    mapper = inspect(model)
+    info = _pk_info_cache.get(mapper)
+    if info is None:
+        pk_cols = set(pk.name for pk in mapper.primary_key)
+        names = []
+        columns = []
+        for prop in mapper.iterate_properties:
+            if not isinstance(prop, ColumnProperty):
+                continue
+            if len(prop.columns) != 1:
+                raise ValueError("Unexpected number of columns. Please report "
+                                 "this as a bug.")  # pragma: no cover
+            if prop.columns[0].name in pk_cols:
+                names.append(prop.key)
+                columns.append(prop.columns[0])
+        converters = [_get_converter(column) for column in columns]
+        info = PrimaryKeyInfo(tuple(names), tuple(columns), tuple(converters))
+        _pk_info_cache[mapper] = info
+    return info
 
 
 def get_pks(model):
     """
     Get a list of primary key attribute names, i.e. those attributes that
-    represent a primary key.
+    represent a primary key. The result is cached, see :func:`get_pk_info`.
 
     :param model: A model for which to search the keys.
     """
-    pk_cols = set(pk.name for pk in inspect(model).primary_key)
-    pk_attributes = []
-    for prop in inspect(model).iterate_properties:
-        if not isinstance(prop, ColumnProperty):
+    return list(get_pk_info(model).names)
+
+
+def can_bulk_delete(model):
+    """
+    Find out whether the rows of ``model`` can be deleted with a plain
+    ``DELETE`` statement instead of deleting each instance through the
+    session. This is not the case if deleting an instance does more than
+    removing its row:
+
+    * The model is part of an inheritance hierarchy or has a version
+      counter.
+    * There are ``before_delete`` or ``after_delete`` listeners on the
+      mapper.
+    * A relationship cascades deletes to related objects or, for
+      collections, sets their foreign keys to ``NULL`` or removes rows of a
+      secondary table. Collections with ``passive_deletes`` leave this to
+      the database and are fine.
+
+    :param model: The model that is to be deleted.
+    """
+    mapper = inspect(model)
+    if (mapper.inherits is not None or
+            len(mapper.self_and_descendants) > 1 or
+            mapper.version_id_col is not None):
+        return False
+    if mapper.dispatch.before_delete or mapper.dispatch.after_delete:
+        return False
+    for prop in mapper.relationships:
+        if prop.viewonly:
             continue
-        if len(prop.columns) != 1:
-            raise ValueError("Unexpected number of columns. Please report "
-                             "this as a bug.")  # pragma: no cover
-        if prop.columns[0].name in pk_cols:
-            pk_attributes.append(prop.key)
-    return pk_attributes
+        if prop.direction is MANYTOONE:
+            if prop.cascade.delete:
+                return False
+        elif not prop.passive_deletes:
+            return False
+    return True
+
+
+class ImmutableDict(dict):
+    """
+    A :class:`dict` that cannot be changed after it has been created. It is
+    used for structures that are computed once and then shared, e.g. the
+    column headings of the list view.
+    """
+
+    def _immutable(self, *args, **kw):
+        raise TypeError("'%s' object does not support item assignment"
+                        % type(self).__name__)
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+class TTLCache(object):
+    """
+    A simple thread-safe cache whose entries expire after a given number of
+    seconds. It is used to share the results of expensive queries (e.g.
+    counts) between requests.
+
+    :param maxsize: The maximum number of entries. If the cache is full, the
+        oldest entry is removed.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Get the value for ``key`` or ``default`` if it is missing or has
+        expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= time.time():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl):
+        """
+        Store ``value`` for ``key`` for ``ttl`` seconds.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.time() + ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._data.clear()
+
+
+def split(items, size):
+    """
+    Split the sequence ``items`` into lists of at most ``size`` items.
+    """
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+
+def expunge_rows(session, rows):
+    """
+    Remove all instances in ``rows`` from ``session``. A row may be an
+    instance or a tuple that contains instances, e.g. with additional
+    columns. Other values as well as instances with unflushed changes are
+    left alone, so no change is lost.
+    """
+    for row in rows:
+        values = row if isinstance(row, tuple) else (row,)
+        for value in values:
+            state = inspect(value, False)
+            if (isinstance(state, InstanceState) and
+                    state.session_id == session.hash_key and
+                    not state.modified and state.persistent):
+                session.expunge(value)
+
+
+def iter_batches(query, size, expunge=True):
+    """
+    Iterate over the rows of ``query`` in lists of at most ``size`` rows.
+    The rows are fetched from the cursor with
+    :meth:`sqlalchemy.orm.query.Query.yield_per` while iterating, so only a
+    single batch is in memory at once.
+
+    :param expunge: If this is ``True``, the instances of a batch are
+        removed from the session (see :func:`expunge_rows`) as soon as the
+        next batch is requested, i.e. after the previous batch has been
+        processed. The identity map then does not grow with the number of
+        rows. Do not keep references to instances of previous batches as
+        they are detached and cannot load anything anymore.
+    """
+    rows = iter(query.yield_per(size))
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        try:
+            yield batch
+        finally:
+            if expunge:
+                expunge_rows(query.session, batch)
 
 
 class meta_property(object):
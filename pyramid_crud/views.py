@@ -1,16 +1,33 @@
-from pyramid.httpexceptions import HTTPFound
+from pyramid.httpexceptions import HTTPFound, HTTPNotFound
 from pyramid.decorator import reify
-from pyramid.renderers import render_to_response
+from pyramid.renderers import render, render_to_response
+from webob.acceptparse import create_accept_encoding_header
 import venusian
 import six
 import logging
-from .util import get_pks
+import operator
+import functools
+import csv
+import json
+import zlib
+from .util import (get_pks, get_pk_info, can_bulk_delete, ImmutableDict,
+                   TTLCache, iter_batches, split)
+from .pagination import Page, KeysetPage, SortKey, ExactCount
+from .filters import Filter, get_filter
+from .search import LikeSearch
 from traceback import format_exc
 from .forms import CSRFForm
 from .fields import MultiCheckboxField, SelectField, MultiHiddenField
 from wtforms.fields import SubmitField, HiddenField
 from wtforms.validators import InputRequired
 import sqlalchemy
+from sqlalchemy import func, select
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import load_only, joinedload, selectinload, aliased
+from sqlalchemy.orm.properties import RelationshipProperty, ColumnProperty
+from sqlalchemy.ext.hybrid import HYBRID_PROPERTY
+from sqlalchemy.sql.elements import ColumnElement
+from collections import namedtuple
 try:
     from collections import OrderedDict
 except ImportError:  # pragma: no cover
@@ -233,6 +250,295 @@ class ViewConfigurator(object):
                              renderer=self.view_class.get_template_for('edit'))
         return self._configure_route('new', '/new')
 
+    def configure_export_view(self):
+        """
+        This method behaves exactly like
+        :meth:`ViewConfigurator.configure_list_view` except it must configure
+        the export view (see :ref:`list_export <list_export>`). Its route
+        must have a ``format`` placeholder that holds the name of the format.
+        The view has no renderer as it returns a response. It must return
+        the name of the route as well that will then be stored under the
+        "export" key.
+
+        It is only called if exports are enabled with ``list_export``, so
+        custom configurators only need it in this case.
+
+        .. warning::
+
+            The export view contains the same items as the list view. If
+            you restrict access to the list view in
+            :meth:`configure_list_view`, e.g. with a ``permission``, you
+            have to restrict the export view here in the same way.
+        """
+        self._configure_view('export')
+        return self._configure_route('export', '/export.{format}')
+
+
+class ListColumn(object):
+    """
+    A single entry of :ref:`list_display <list_display>` that has been
+    resolved ahead of time. Instead of finding out what an entry refers to
+    for every cell of the list view, this is done once per view class and
+    each column is turned into a specialized accessor.
+
+    :param name: The name of the column as returned by
+        :meth:`CRUDView.iter_list_cols`.
+
+    :param kind: What the column refers to, one of :attr:`MODEL_ATTRIBUTE`,
+        :attr:`MODEL_METHOD`, :attr:`PATH`, :attr:`EXPRESSION`, :attr:`VIEW`
+        or :attr:`CALLABLE`.
+
+    :param target: The attribute name for all kinds except
+        :attr:`CALLABLE` where it is the callable itself, :attr:`PATH`
+        where it is a tuple of attribute names and :attr:`EXPRESSION` where it
+        is the SQL expression.
+
+    :param info: The column heading as returned by
+        :meth:`CRUDView.iter_head_cols`. It is an
+        :class:`.ImmutableDict` as it is shared between all requests.
+
+    If a :attr:`VIEW` or :attr:`CALLABLE` column has the ``batch`` flag set
+    in its ``info`` dict, :attr:`batch` is ``True``. The accessor returned by
+    :meth:`bind` then receives all items of a page at once and returns a
+    mapping of primary keys to values.
+    """
+    #: A (non-callable) attribute on the model, e.g. a column.
+    MODEL_ATTRIBUTE = 'model_attribute'
+    #: A method on the model that is called without arguments.
+    MODEL_METHOD = 'model_method'
+    #: A dotted path of relationships on the model, e.g. ``author.name``.
+    PATH = 'path'
+    #: A SQL expression that is selected together with the items.
+    EXPRESSION = 'expression'
+    #: An attribute or method on the view that is called with the object.
+    VIEW = 'view'
+    #: A free callable that is called with the object.
+    CALLABLE = 'callable'
+
+    __slots__ = ('name', 'kind', 'target', 'info', 'batch', '_getter')
+
+    def __init__(self, name, kind, target, info):
+        self.name = name
+        self.kind = kind
+        self.target = target
+        self.info = info
+        self.batch = (kind in (self.VIEW, self.CALLABLE) and
+                      bool(info.get('batch')))
+        if kind == self.MODEL_ATTRIBUTE:
+            self._getter = operator.attrgetter(target)
+        elif kind == self.MODEL_METHOD:
+            self._getter = operator.methodcaller(target)
+        elif kind == self.PATH:
+            self._getter = _path_getter(target)
+        elif kind == self.CALLABLE:
+            self._getter = target
+        else:
+            self._getter = None
+
+    def bind(self, view):
+        """
+        Get the accessor for this column on a specific view instance. The
+        result is a callable that receives a single object and returns the
+        value of this column for it. In :ref:`read-only mode <list_readonly>`
+        the object is a row instead.
+        """
+        if view.list_readonly and self.kind in (self.EXPRESSION, self.PATH):
+            # Selected as a labeled column of the row
+            return _row_getter(self.name)
+        if self._getter is not None:
+            return self._getter
+        if self.kind == self.EXPRESSION:
+            return functools.partial(view._get_expression_value, self.name)
+        value = getattr(view, self.target)
+        if callable(value):
+            return value
+        return lambda obj: value
+
+
+def _row_getter(name):
+    def getter(row):
+        # The name may contain dots, so this cannot use attrgetter
+        return getattr(row, name)
+    return getter
+
+
+def _get_hybrid_expression(model, name):
+    # Hybrids that only work in Python may fail or return anything on the
+    # class, those are not evaluated by the database.
+    try:
+        value = getattr(model, name)
+        clause = getattr(value, '__clause_element__', lambda: value)()
+    except Exception:
+        return None
+    if isinstance(clause, ColumnElement):
+        return value
+    return None
+
+
+def _path_getter(keys):
+    def getter(obj):
+        for key in keys:
+            # Relationships along the path may be empty
+            if obj is None:
+                return None
+            obj = getattr(obj, key)
+        return obj
+    return getter
+
+
+def _resolve_path(model, keys):
+    """
+    Resolve a path of attribute names on ``model`` where all but the last
+    attribute must be relationships that do not hold a collection.
+
+    :return: A list of the attributes along the path.
+    """
+    attributes = []
+    for index, key in enumerate(keys):
+        if not hasattr(model, key):
+            raise AttributeError("No attribute of name '%s' on model %s found"
+                                 % (key, model.__name__))
+        attribute = getattr(model, key)
+        attributes.append(attribute)
+        if index == len(keys) - 1:
+            break
+        prop = getattr(attribute, 'property', None)
+        if not isinstance(prop, RelationshipProperty):
+            raise AttributeError("Attribute '%s' on model %s is not a "
+                                 "relationship" % (key, model.__name__))
+        if prop.uselist:
+            raise ValueError("Relationship '%s' on model %s is a collection "
+                             "and cannot be part of a path"
+                             % (key, model.__name__))
+        model = prop.mapper.class_
+    return attributes
+
+
+class RelationshipCount(object):
+    """
+    An entry for :ref:`list_display <list_display>` that displays the number
+    of related objects in a relationship. The number is computed by the
+    database with a correlated subquery, so the related objects are never
+    loaded.
+
+    :param relationship: The name of the relationship on the model.
+
+    :param label: The column heading. By default it is derived from the
+        name.
+
+    :param name: The name of the column. By default it is the name of the
+        relationship followed by ``_count``.
+
+    Example:
+
+    .. code-block:: python
+
+        class View(CRUDView):
+            list_display = ('title', RelationshipCount('comments'))
+
+    .. note::
+
+        Self-referential relationships are only supported if they use a
+        secondary table.
+    """
+
+    def __init__(self, relationship, label=None, name=None):
+        self.relationship = relationship
+        self.name = name or '%s_count' % relationship
+        if label is None:
+            label = self.name.replace("_", " ").title()
+        self.info = {'label': label}
+
+    def get_expression(self, model):
+        """
+        Get the scalar subquery that counts the related objects of ``model``.
+        """
+        attribute = getattr(model, self.relationship, None)
+        prop = getattr(attribute, 'property', None)
+        if not isinstance(prop, RelationshipProperty):
+            raise AttributeError("Attribute '%s' on model %s is not a "
+                                 "relationship"
+                                 % (self.relationship, model.__name__))
+        if prop.secondary is not None:
+            target = prop.secondary
+        else:
+            target = prop.target
+            if target in inspect(model).tables:
+                raise ValueError("Cannot count the self-referential "
+                                 "relationship '%s' on model %s"
+                                 % (self.relationship, model.__name__))
+        query = select([func.count()]).select_from(target)
+        query = query.where(prop.primaryjoin).correlate_except(target)
+        return query.as_scalar()
+
+
+_EXPORT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _format_csv(rows):
+    """
+    Format ``rows`` (lists of values) as lines of CSV encoded with UTF-8.
+    ``None`` is written as an empty value.
+    """
+    output = six.StringIO()
+    writer = csv.writer(output)
+    for row in rows:
+        values = [u'' if value is None else six.text_type(value)
+                  for value in row]
+        if six.PY2:
+            values = [value.encode('utf-8') for value in values]
+        writer.writerow(values)
+    output = output.getvalue()
+    if not six.PY2:
+        output = output.encode('utf-8')
+    return output
+
+
+def _format_ndjson(names, rows):
+    """
+    Format ``rows`` (lists of values) as lines of JSON objects that map
+    ``names`` to the values. Values that JSON does not support, e.g.
+    dates, are converted to strings.
+    """
+    lines = [json.dumps(OrderedDict(zip(names, row)),
+                        default=six.text_type) + '\n'
+             for row in rows]
+    return ''.join(lines).encode('utf-8')
+
+
+def _gzip_stream(chunks, buffer_size):
+    """
+    Compress an iterable of byte strings with gzip while it is consumed.
+    The compressor is flushed after the first chunk and whenever at least
+    ``buffer_size`` bytes have been passed into it since the last flush, so
+    no more than that is held back before it is sent.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = buffer_size
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= buffer_size:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+CompiledListDisplay = namedtuple('CompiledListDisplay', 'columns head links')
+"""
+The result of compiling :ref:`list_display <list_display>` and
+:ref:`list_display_links <list_display_links>` for a view class. ``columns``
+is a tuple of :class:`ListColumn` instances, ``head`` a tuple of their
+headings (see :meth:`CRUDView.iter_head_cols`) and ``links`` a
+:class:`frozenset` of the positions of those columns that link to the edit
+view.
+"""
+
 
 class CRUDCreator(type):
     """
@@ -253,6 +559,8 @@ class CRUDCreator(type):
                 'edit': edit_route,
                 'new': new_route,
             }
+            if cls.list_export:
+                cls.routes['export'] = configurator.configure_export_view()
         if '__abstract__' not in attrs:
             have_attrs = set(attrs)
             need_attrs = set(('Form', 'url_path'))
@@ -267,6 +575,14 @@ class CRUDCreator(type):
 
             # Initialize mutable defaults
             cls.actions = []
+            cls._action_form_classes = {}
+            cls._list_columns_cache = {}
+            cls._list_filters_cache = {}
+            cls._list_facets_cache = TTLCache()
+
+            if cls.search_fields:
+                cls.search_backend.setup(cls.Form.Meta.model,
+                                         cls.search_fields)
 
 
 @six.add_metaclass(CRUDCreator)
@@ -363,6 +679,25 @@ class CRUDView(object):
               class View(CRUDView):
                   list_display = ('id_plus_one',)
 
+        * A dotted path to an attribute of a related model, for example
+          ``author.name``. Each part except the last one has to be a
+          relationship that refers to a single object (not a collection). If
+          any object along the path is ``None``, the value is ``None`` as
+          well. For example:
+
+          .. code-block:: python
+
+              class Book(Base):
+                  id = Column(Integer, primary_key=True)
+                  author_id = Column(ForeignKey('author.id'))
+                  author = relationship(Author)
+
+              class View(CRUDView):
+                  list_display = ('id', 'author.name')
+
+          The title is taken from the ``info`` dict of the last attribute if
+          available, otherwise the path is used (here: "Author Name").
+
         * A generic callable function. This function will be called with a
           single argument: The instance of the model. For example:
 
@@ -404,6 +739,69 @@ class CRUDView(object):
           <th> fields in the column heading to allow application of CSS
           attributes, e.g. to set the width of a column.
 
+        * A hybrid property on the model whose value on the class is an SQL
+          expression or any entry that has an ``expression`` in its ``info``
+          dict. The SQL expression is added to the query of the list view
+          as a column labeled with the name of the entry, so the database
+          computes the value together with the items instead of running
+          Python code for every row. Hybrids that only work in Python are
+          displayed like any other attribute. For example:
+
+          .. code-block:: python
+
+              class View(CRUDView):
+                  list_display = ('id', 'title_length')
+
+                  def title_length(self, obj):
+                      pass
+                  title_length.info = {
+                      'label': 'Title Length',
+                      'expression': func.length(Post.title),
+                  }
+
+          Correlated subqueries can be used as expressions. The callable
+          itself is never called for such an entry.
+
+        * An instance of :class:`RelationshipCount` to display the number of
+          related objects without loading them.
+
+        * A callable or view method that has ``batch`` set to ``True`` in
+          its ``info`` dict is called only once for each page instead of once
+          for each row. It receives a list of all items on the page and has
+          to return a mapping of primary keys (a tuple for multiple primary
+          keys) to the value of the column. Items missing from the mapping
+          show ``None``. This allows computing values from other tables with
+          a single query. For example:
+
+          .. code-block:: python
+
+              class View(CRUDView):
+                  list_display = ('id', 'comment_count')
+
+                  def comment_count(self, items):
+                      ids = [item.id for item in items]
+                      query = (self.dbsession.
+                               query(Comment.post_id, func.count()).
+                               filter(Comment.post_id.in_(ids)).
+                               group_by(Comment.post_id))
+                      return dict(query)
+                  comment_count.info = {'label': 'Comments', 'batch': True}
+
+        * The list can be sorted by columns of the model and SQL expression
+          columns by clicking on their heading. The order is passed in the
+          ``order`` parameter of the query string, see
+          :attr:`CRUDView._list_order_params`.
+
+        * All relationships displayed, either directly or as part of a
+          path, are loaded eagerly together with the items so the number of
+          queries does not grow with the number of rows on a page (see
+          :meth:`CRUDView._get_list_eager_loads`).
+
+        * What each string refers to is determined only once per view class
+          (see :class:`ListColumn`). Thus, attributes added to the model or
+          view after the list has been displayed for the first time are not
+          taken into account.
+
         * If the attribute ``info`` cannot be found on the attribute (at the
           class level, not instance level), default value is determined as the
           column heading. If name of the column is ``__str__`` then the name
@@ -434,12 +832,315 @@ class CRUDView(object):
         This configuration will turn the columns ``column1`` and ``column3``
         into links.
 
+    .. _list_load_columns:
+
+    list_load_columns
+        The list view only loads those columns from the database that are
+        actually displayed. If all entries of
+        :ref:`list_display <list_display>` are plain columns of the model, this
+        is determined automatically and all other columns (e.g. large text or
+        binary columns) are deferred. As soon as any other kind of entry is
+        used (for example a callable or the default ``__str__``), it is not
+        known which columns are needed and thus all columns are loaded.
+
+        In this case, you can set this to an iterable of the names of the
+        columns needed by those entries. They are loaded in addition to the
+        plain columns in ``list_display`` and the primary keys. Any other
+        column accessed on an item is still loaded, but with a separate query
+        for each item. By default this is ``None``.
+
+        Example:
+
+        .. code-block:: python
+
+            class MyView(CRUDView):
+                list_display = ('title', 'summary')
+                list_load_columns = ('body',)
+
+                def summary(self, obj):
+                    return obj.body[:100]
+
+    .. _list_readonly:
+
+    list_readonly
+        Display rows instead of instances of the model on the list view. If
+        this is ``True``, the list query only selects the columns needed by
+        :ref:`list_display <list_display>` (and
+        :ref:`list_load_columns <list_load_columns>`) and the items are
+        plain rows with an attribute for each column. They are not added to
+        the session and have no instrumentation, which makes large pages a
+        lot cheaper in memory and time. Columns along a path of
+        relationships (e.g. ``author.name``) are selected with an outer
+        join. By default this is ``False``.
+
+        In this mode, ``list_display`` cannot contain methods of the model
+        (including the default ``__str__``) and callables as well as
+        methods of the view receive the row instead of an instance. The
+        row contains the primary keys, so links to the edit view and
+        actions work as usual.
+
+        Example:
+
+        .. code-block:: python
+
+            class MyView(CRUDView):
+                list_display = ('title', 'author.name', 'created')
+                list_readonly = True
+
+    .. _list_filter:
+
+    list_filter
+        A tuple of filters that are displayed above the list view to narrow
+        down the listed items. Each active filter is turned into a ``WHERE``
+        clause of the list query, so the database only returns matching
+        items. An entry is either an instance of :class:`.filters.Filter` or
+        the name of an attribute on the model for which a filter is created
+        automatically (see :func:`.filters.get_filter`):
+
+        * A relationship to a single object offers all related objects that
+          are referenced by any item.
+        * A boolean column offers "Yes" and "No".
+        * A date or datetime column offers a range of days.
+        * Any other column offers all of its distinct values.
+
+        Example:
+
+        .. code-block:: python
+
+            from pyramid_crud.filters import ChoiceFilter
+
+            class MyView(CRUDView):
+                list_filter = ('author', 'published', 'created',
+                               ChoiceFilter('status', choices=STATUSES))
+
+        The values are passed in the query string, e.g.
+        ``?author=3&published=1``. By default no filters are displayed.
+
+    .. _list_facets:
+
+    list_facets
+        If this is ``True``, the number of items matching each option of the
+        :ref:`list_filter <list_filter>` is displayed next to the option.
+        The counts for a filter are computed with a single ``GROUP BY`` query
+        over the current list query (i.e. with all active filters applied).
+        As this is an additional query for each filter on every request, it
+        is disabled by default.
+
+    .. _list_facets_cache_ttl:
+
+    list_facets_cache_ttl
+        The number of seconds for which the counts of
+        :ref:`list_facets <list_facets>` are cached. The cache is shared by
+        all requests to this view class and is keyed by the SQL of the
+        count query, so it is only suitable if you accept counts to be
+        slightly out of date. By default this is ``None`` and counts are not
+        cached.
+
+    .. _search_fields:
+
+    search_fields
+        A tuple of names of columns on the model that can be searched. If it
+        is not empty, a search box is displayed above the list view and the
+        term entered (passed as ``q`` in the query string) is turned into a
+        ``WHERE`` clause of the list query by the
+        :ref:`search_backend <search_backend>`. By default this is empty.
+
+    .. _search_backend:
+
+    search_backend
+        An instance of :class:`.search.SearchBackend` that performs the
+        search. By default, :class:`.search.LikeSearch` is used which works
+        everywhere but scans the whole table. For large tables, use an
+        indexed backend like :class:`.search.PostgresSearch` or
+        :class:`.search.SQLiteFTSSearch`:
+
+        .. code-block:: python
+
+            from pyramid_crud.search import PostgresSearch
+
+            class MyView(CRUDView):
+                search_fields = ('title', 'body')
+                search_backend = PostgresSearch('english')
+
+    .. _list_per_page:
+
+    list_per_page
+        The maximum number of items displayed on a single page of the list
+        view. By default this is ``100``. The page is selected in the database
+        using ``LIMIT`` and ``OFFSET`` and the current page number is read from
+        the ``page`` parameter of the query string. To keep pages stable, the
+        list is always ordered by the primary keys as the last criterion (see
+        :meth:`CRUDView._get_list_order`).
+
+        If this is ``None``, pagination is disabled and all items are
+        displayed on a single page. This is not recommended for tables with
+        many rows.
+
+    .. _list_count:
+
+    list_count
+        The strategy that counts the items of the list view for
+        ``'offset'`` :ref:`pagination <list_pagination>`. It is called with
+        the list query and returns a tuple of the number of items and
+        whether that number is exact. By default,
+        :class:`.pagination.ExactCount` counts the items on every request.
+        On large tables you can use :class:`.pagination.CachedCount` to
+        cache the count for each combination of filters or
+        :class:`.pagination.ApproximateCount` to use the statistics of the
+        database. If the count is not exact, the template displays it as an
+        approximation. For example:
+
+        .. code-block:: python
+
+            from pyramid_crud.pagination import ApproximateCount, CachedCount
+
+            class MyView(CRUDView):
+                list_count = ApproximateCount(threshold=100000,
+                                              fallback=CachedCount(ttl=300))
+
+    .. _list_pagination:
+
+    list_pagination
+        How the list view is split into pages. The default is ``'offset'``
+        which selects pages using ``LIMIT`` and ``OFFSET`` (see
+        :class:`.Page`). This allows jumping to any page but the database
+        has to skip all rows before the requested page, so deep pages on huge
+        tables become slow.
+
+        If this is set to ``'keyset'``, the rows are instead selected after
+        the last row of the previous page, e.g. with
+        ``WHERE (sort_col, pk) > (:last_sort, :last_pk)`` (see
+        :class:`.KeysetPage`). Any page then costs the same as the first one
+        but only links to the previous and next page are available. The
+        position is passed as an opaque token in the ``cursor`` parameter of
+        the query string. Any ordering already present on
+        :meth:`CRUDView.get_list_query` is replaced by
+        :meth:`CRUDView._get_list_order` in this mode.
+
+    .. _list_stream:
+
+    list_stream
+        Stream the list view to the client instead of rendering the
+        complete page before sending it. If this is ``True``, everything
+        before the rows of the table is sent right away and the rows are
+        then rendered and sent in batches of ``list_stream_batch_size``
+        (``100`` by default) as they are fetched from the database. This
+        reduces the time until the first byte is received and the memory
+        used by large pages (e.g. if :ref:`list_per_page <list_per_page>` is
+        ``None``). Batch columns of :ref:`list_display <list_display>` are
+        called once for each batch.
+
+        The list template has to support this: It must render the
+        ``stream_marker`` it receives in place of the rows and define a
+        ``list_rows(items, checkboxes)`` def that renders a batch of rows
+        (see :meth:`CRUDView._stream_list`). By default this is disabled.
+
+        .. note::
+
+            With ``'keyset'`` :ref:`pagination <list_pagination>` the links
+            to the next and previous page depend on the items, so the page is
+            loaded completely before anything is sent. The rows are still
+            rendered in batches.
+
+        .. warning::
+
+            The rows are queried while the response is sent, i.e. after the
+            view has returned. A transaction manager such as ``pyramid_tm``
+            with ``zope.sqlalchemy`` has already committed the transaction
+            and closed the session by then, so the rows query starts a new
+            transaction that is never ended. Only enable this if the session
+            stays usable until the response has been sent, e.g. with a
+            session that is closed by a finished callback or a middleware
+            around the whole response.
+
+    .. _list_export:
+
+    list_export
+        The formats in which the list view can be exported, e.g. ``('csv',
+        'ndjson')``. By default this is an empty tuple and exports are
+        disabled. If it is set, the export view is configured by
+        :meth:`ViewConfigurator.configure_export_view` and available at
+        ``<url_path>/export.<format>``, e.g. ``/users/export.csv``, and
+        contains all items that match the filters and search term of the
+        query string in the current order. Its columns are the same as in
+        :ref:`list_display <list_display>`, CSV files use the labels of the
+        columns as their first row and each line of NDJSON is an object
+        that maps the names of the columns to their values.
+
+        .. warning::
+
+            Settings made in
+            :meth:`ViewConfigurator.configure_list_view` do not apply to
+            the export view. If you protect the list view with a
+            permission there, protect the export view in
+            :meth:`ViewConfigurator.configure_export_view` as well.
+
+        The response is streamed: Its first bytes are sent right away and
+        the items are loaded in batches of ``list_export_batch_size``
+        (``1000`` by default) using
+        :meth:`sqlalchemy.orm.query.Query.yield_per`, so the memory used
+        does not grow with the number of exported items. See
+        :meth:`CRUDView.export` for details.
+
+    .. _list_export_compress:
+
+    list_export_compress
+        Whether exports may be compressed with gzip while they are streamed,
+        ``True`` by default. Clients that send ``gzip`` in their
+        ``Accept-Encoding`` header receive the response with
+        ``Content-Encoding: gzip`` and decompress it transparently. Adding
+        ``compress=1`` to the query string instead downloads a gzip file
+        (e.g. ``users.csv.gz``), regardless of the header. The compressor is
+        flushed whenever ``list_export_buffer_size`` bytes (``64 KiB`` by
+        default) have been written to it, so only a bounded part of the
+        export is held back at any time. Disable this if a server or
+        middleware in front of your application compresses responses
+        already.
+
     .. _actions_cfg:
 
     actions:
         An optional list of action callables or view method names for the
         dropdown menu. See :ref:`actions` for details on how to use it.
 
+    .. _delete_batch_size:
+
+    delete_batch_size
+        The number of items that the default delete action loads, deletes
+        and flushes at once, by default ``1000``. The deleted items are
+        removed from the session after each batch, so the memory used does
+        not grow with the number of selected items.
+
+    .. _delete_bulk:
+
+    delete_bulk
+        If this is ``True``, the default delete action removes all selected
+        items with a single ``DELETE`` statement instead of loading and
+        deleting each of them through the session. This is much faster for
+        many items but skips everything the ORM would do in Python, so it is
+        only used if :func:`.can_bulk_delete` finds nothing of that kind on
+        the model. Otherwise the items are deleted in batches as usual.
+        Database-level cascades (``ON DELETE``) still apply. Defaults to
+        ``False``.
+
+    .. _delete_savepoints:
+
+    delete_savepoints
+        If this is ``True``, the default delete action deletes each batch
+        of ``delete_batch_size`` items inside its own savepoint, including
+        bulk deletes which are then split into one statement per batch. If
+        a batch fails, only this batch is rolled back: The items of earlier
+        batches stay deleted and the user is told how many of the selected
+        items were deleted. After each batch :meth:`delete_progress` is
+        called. Defaults to ``False``, in which case any error rolls back
+        the whole deletion.
+
+        Savepoints do not end the surrounding transaction, so locks are held
+        until it is committed (e.g. by ``pyramid_tm`` at the end of the
+        request). To release them earlier, commit in
+        :meth:`delete_progress`, if your application manages its
+        transactions itself.
+
     .. _theme_cfg:
 
     theme
@@ -516,38 +1217,123 @@ class CRUDView(object):
     template_ext = '.mako'
     template_base_name = 'base'
     view_configurator_class = ViewConfigurator
+    list_load_columns = None
+    list_filter = ()
+    list_facets = False
+    list_facets_cache_ttl = None
+    search_fields = ()
+    search_backend = LikeSearch()
+    list_per_page = 100
+    list_count = ExactCount()
+    list_pagination = 'offset'
+    list_readonly = False
+    list_stream = False
+    list_stream_batch_size = 100
+    list_export = ()
+    list_export_batch_size = 1000
+    list_export_compress = True
+    list_export_buffer_size = 64 * 1024
+    delete_batch_size = 1000
+    delete_bulk = False
+    delete_savepoints = False
 
     def __init__(self, request):
         self.request = request
         self._action_form = None
 
     def _get_item_choices(self, items=None):
+        """
+        Get the choices for the checkboxes of the action form.
+
+        :param items: The items for which to create choices. By default the
+            items of the current page are used so the choices are based on the
+            rows that are actually displayed and no additional query is
+            needed.
+        """
         pks = get_pks(self.Form.Meta.model)
         if len(pks) != 1:
             raise ValueError("Can only handle a single primary key")
         [pk] = pks
 
+        if items is None:
+            items = self._list_page.items
+
         cb_choices = []
-        for item in (items or self.get_list_query()):
+        for item in items:
             cb_choices.append((str(getattr(item, pk)), ''))
         return cb_choices
 
+    def _lookup_items(self, values):
+        """
+        Find out which of the given primary key values belong to items of
+        the list view, i.e. those selected by :meth:`get_list_query`. Only
+        the given values are resolved, using a single ``pk IN (...)`` query,
+        so validating a selection does not depend on the size of the table.
+
+        :param values: A list of primary key values as submitted by the
+            user, i.e. strings.
+
+        :return: A set of those ``values`` that belong to listed items.
+        """
+        Model = self.Form.Meta.model
+        pks = get_pks(Model)
+        if len(pks) != 1:
+            raise ValueError("Can only handle a single primary key")
+        [pk] = pks
+        column = getattr(Model, pk)
+        [convert] = get_pk_info(Model).converters
+
+        keys = []
+        for value in values:
+            try:
+                keys.append(convert(value))
+            except (TypeError, ValueError, ArithmeticError):
+                continue
+        if not keys:
+            return set()
+        query = (self.get_list_query().
+                 with_entities(column).
+                 order_by(None).
+                 filter(column.in_(keys)))
+        return set(six.text_type(key) for key, in query)
+
     def get_action_form(self):
+        """
+        Get the form class for executing actions on the list view.
+
+        The class and its action choices are only created once per view class
+        (and set of actions) and then reused. The per-request parts are given
+        as keyword arguments during instantiation: ``item_choices`` are the
+        choices for the item checkboxes (see :meth:`_get_item_choices`) and
+        ``lookup`` is the callable used to validate the selected items (see
+        :meth:`_lookup_items`).
+        """
         if self._action_form is None:
+            if len(get_pks(self.Form.Meta.model)) != 1:
+                raise ValueError("Can only handle a single primary key")
             action_choices = [('', '--- Select Action ---')]
             action_choices += [(name, info['label'])
                                for name, info in self._all_actions.items()]
-
-            req_validator = InputRequired('You must select at least one '
-                                          'item')
-            cb_choices = self._get_item_choices()
-
-            class ActionForm(CSRFForm):
-                action = SelectField('Action:', choices=action_choices)
-                items = MultiCheckboxField(choices=cb_choices,
-                                           validators=[req_validator])
-                submit = SubmitField("Execute")
-
+            key = tuple(action_choices)
+            ActionForm = self._action_form_classes.get(key)
+
+            if ActionForm is None:
+                req_validator = InputRequired('You must select at least one '
+                                              'item')
+
+                class ActionForm(CSRFForm):
+                    action = SelectField('Action:', choices=action_choices)
+                    items = MultiCheckboxField(validators=[req_validator])
+                    submit = SubmitField("Execute")
+
+                    def __init__(self, *args, **kw):
+                        item_choices = kw.pop('item_choices', ())
+                        lookup = kw.pop('lookup', None)
+                        super(ActionForm, self).__init__(*args, **kw)
+                        self.items.choices = list(item_choices)
+                        self.items.lookup = lookup
+
+                self._action_form_classes[key] = ActionForm
             self._action_form = ActionForm
         return self._action_form
 
@@ -578,12 +1364,23 @@ class CRUDView(object):
     def delete(self, query):
         """
         Delete all objects in the ``query``.
+
+        Only the primary keys are loaded to validate the confirmation. The
+        objects are then loaded, deleted and flushed in batches of
+        ``delete_batch_size`` so that not all of them are in memory at
+        once. With ``delete_bulk`` they are deleted with a single statement
+        instead if the model allows it. With ``delete_savepoints`` each batch
+        is deleted in its own savepoint and :meth:`delete_progress` is called
+        after each of them.
         """
         try:
-            items = query.all()
+            Model = self.Form.Meta.model
+            [pk] = get_pks(Model)
+            pk_column = getattr(Model, pk)
+            keys = [row[0] for row in query.with_entities(pk_column)]
             req_validator = InputRequired('You must select at least one '
                                           'item')
-            choices = self._get_item_choices(items)
+            choices = [(str(key), '') for key in keys]
 
             class ConfirmationForm(CSRFForm):
                 action = HiddenField()
@@ -597,10 +1394,30 @@ class CRUDView(object):
                     # Likely CSRF or other fiddling, don't bother checking
                     raise Exception
 
-                item_count = len(items)
-                for item in items:
-                    self.dbsession.delete(item)
-                self.dbsession.flush()
+                bulk = self.delete_bulk and can_bulk_delete(Model)
+                if bulk and not self.delete_savepoints:
+                    batches = [query]
+                else:
+                    batches = (query.filter(pk_column.in_(batch))
+                               for batch in split(keys,
+                                                  self.delete_batch_size))
+                item_count = 0
+                for batch in batches:
+                    try:
+                        item_count += self._delete_batch(batch, bulk)
+                    except Exception:
+                        if not (self.delete_savepoints and item_count):
+                            raise
+                        # Earlier batches were released and are kept
+                        log.warning("Deletion of items failed:\n%s"
+                                    % format_exc())
+                        message = ("Only %d of %d %s deleted, there was an "
+                                   "error deleting the remaining item(s)"
+                                   % (item_count, len(keys),
+                                      self.Form.title_plural))
+                        self.request.session.flash(message, 'error')
+                        return True, None
+                    self.delete_progress(item_count, len(keys))
                 if item_count == 1:
                     title = self.Form.title
                 else:
@@ -609,7 +1426,7 @@ class CRUDView(object):
                 self.request.session.flash(message)
                 return True, None
             else:
-                data = {'items': items, 'view': self, 'form': form}
+                data = {'items': query.all(), 'view': self, 'form': form}
                 template = self.get_template_for('delete_confirm')
                 response = render_to_response(template, data,
                                               request=self.request)
@@ -621,6 +1438,51 @@ class CRUDView(object):
             return False, None
     delete.info = {'label': 'Delete'}
 
+    def _delete_batch(self, query, bulk):
+        """
+        Delete all objects in ``query`` for :meth:`delete`, inside a
+        savepoint if :ref:`delete_savepoints <delete_savepoints>` is
+        enabled.
+
+        :param bulk: Whether the objects are deleted with a single ``DELETE``
+            statement instead of loading them into the session.
+
+        :return: The number of deleted objects.
+        """
+        if self.delete_savepoints:
+            with self.dbsession.begin_nested():
+                return self._delete_batch_items(query, bulk)
+        return self._delete_batch_items(query, bulk)
+
+    def _delete_batch_items(self, query, bulk):
+        """
+        Delete all objects in ``query`` without a savepoint, see
+        :meth:`_delete_batch`.
+        """
+        if bulk:
+            return query.delete(synchronize_session=False)
+        items = query.all()
+        for item in items:
+            self.dbsession.delete(item)
+        self.dbsession.flush()
+        # Release the deleted instances so memory does not grow with the
+        # number of batches until the transaction ends
+        for item in items:
+            self.dbsession.expunge(item)
+        return len(items)
+
+    def delete_progress(self, deleted, total):
+        """
+        Called by the default delete action after each batch of items has
+        been deleted. This does nothing by default. Override it to report
+        the progress of a large deletion, e.g. by storing it where a status
+        view can read it.
+
+        :param deleted: The number of items deleted so far.
+
+        :param total: The number of items that are to be deleted.
+        """
+
     # Misc helper stuff
 
     def _get_request_pks(self):
@@ -682,9 +1544,8 @@ class CRUDView(object):
             object instance as the values.
         """
         Model = self.Form.Meta.model
-        pk_names = get_pks(Model)
         kw = {}
-        for pk in pk_names:
+        for pk in get_pk_info(Model).names:
             kw[pk] = getattr(obj, pk)
             if kw[pk] is None:
                 raise ValueError("An obj needs to have all primary keys "
@@ -704,6 +1565,33 @@ class CRUDView(object):
         kw = self._get_route_pks(obj)
         return self.request.route_url(self.routes['edit'], **kw)
 
+    def _list_route(self, **params):
+        """
+        Get a URL to the list view that keeps the parameters of the current
+        query string, e.g. the page number.
+
+        :param params: Query string parameters to change. A value of ``None``
+            removes the parameter from the URL.
+
+        :return: A URL to the list view with the resulting query string.
+        """
+        query = [(key, value) for key, value in self.request.GET.items()
+                 if key not in params]
+        query.extend((key, value) for key, value in sorted(params.items())
+                     if value is not None)
+        return self.request.route_url(self.routes['list'], _query=query)
+
+    def _export_route(self, format_):
+        """
+        Get a URL to the export view (see :ref:`list_export <list_export>`)
+        for ``format_`` that keeps the filters, search term and ordering of
+        the current query string.
+        """
+        query = [(key, value) for key, value in self.request.GET.items()
+                 if key not in ('page', 'cursor')]
+        return self.request.route_url(self.routes['export'], format=format_,
+                                      _query=query)
+
     # Template helper functions
 
     @classmethod
@@ -744,37 +1632,249 @@ class CRUDView(object):
     def iter_head_cols(self):
         """
         Get an iterable of column headings based on the configuration in
-        ``list_display``.
-        """
-        for col in self.list_display:
-            col_name = col
-            if callable(col_name):
-                col_name = col_name.__name__
-            model = self.Form.Meta.model
-            if isinstance(col, (six.text_type, six.binary_type)):
-                if hasattr(model, col):
-                    col = getattr(model, col)
-                elif hasattr(self, col):
-                    col = getattr(self, col)
-                else:
-                    raise AttributeError("No attribute of name '%s' on model "
-                                         "or view found" % col)
+        ``list_display``. The headings are computed only once per view class
+        and are immutable.
+        """
+        return iter(self._list_display.head)
+
+    @classmethod
+    def _get_head_info(cls, col, col_name):
+        """
+        Compute the heading of a single column of the list view.
+
+        :param col: The object the column refers to, e.g. a model attribute
+            or a callable.
+
+        :param col_name: The name of the column.
+
+        :return: An :class:`.ImmutableDict`.
+        """
+        if hasattr(col, 'info'):
             # Create a copy
-            if hasattr(col, 'info'):
-                col_info = dict(col.info)
+            col_info = dict(col.info)
+        else:
+            if col_name == '__str__':
+                label = cls.Form.Meta.model.__name__
+                col_name = label
             else:
-                if col_name == '__str__':
-                    label = model.__name__
-                    col_name = label
+                label = col_name
+            label = label.replace("_", " ").replace(".", " ").title()
+            col_info = {'label': label}
+        if (hasattr(col, 'type') and
+                isinstance(col.type, sqlalchemy.Boolean)):
+            col_info["bool"] = True
+        col_info.setdefault("css_class",
+                            "column-%s" % col_name.replace(".", "-"))
+        return ImmutableDict(col_info)
+
+    @classmethod
+    def _compile_list_display(cls, list_display, list_display_links=None):
+        """
+        Resolve each entry of ``list_display`` into a :class:`ListColumn` and
+        determine the columns that are turned into links. This is only done
+        once per view class and value of ``list_display`` and
+        ``list_display_links``.
+
+        :param list_display_links: The names of the columns to link or
+            ``None`` to link the first column.
+
+        :return: A :class:`CompiledListDisplay`.
+        """
+        if list_display_links is not None:
+            list_display_links = tuple(list_display_links)
+        key = (tuple(list_display), list_display_links)
+        compiled = cls._list_columns_cache.get(key)
+        if compiled is None:
+            model = cls.Form.Meta.model
+            columns = []
+            mapper = inspect(model)
+            for col in list_display:
+                if isinstance(col, (six.text_type, six.binary_type)):
+                    name = col
+                    descriptor = mapper.all_orm_descriptors.get(col)
+                    # relationship path on model
+                    if '.' in col and not hasattr(model, col):
+                        kind, target = ListColumn.PATH, tuple(col.split('.'))
+                        obj = _resolve_path(model, target)[-1]
+                    # hybrid property
+                    elif (getattr(descriptor, 'extension_type', None) is
+                            HYBRID_PROPERTY):
+                        obj = target = _get_hybrid_expression(model, col)
+                        if target is not None:
+                            kind = ListColumn.EXPRESSION
+                        else:
+                            # only evaluated in Python on each item
+                            kind, target = ListColumn.MODEL_ATTRIBUTE, col
+                            if descriptor.info:
+                                obj = descriptor
+                    elif hasattr(model, col):
+                        obj, target = getattr(model, col), col
+                        if callable(obj):
+                            kind = ListColumn.MODEL_METHOD
+                        else:
+                            kind = ListColumn.MODEL_ATTRIBUTE
+                    # column on view
+                    elif hasattr(cls, col):
+                        obj, target = getattr(cls, col), col
+                        kind = ListColumn.VIEW
+                    else:
+                        raise AttributeError("No attribute of name '%s' on "
+                                             "model or view found" % col)
+                elif isinstance(col, RelationshipCount):
+                    name, obj = col.name, col
+                    kind = ListColumn.EXPRESSION
+                    target = col.get_expression(model)
+                # must be a separate callable
                 else:
-                    label = col_name
-                label = label.replace("_", " ").title()
-                col_info = {'label': label}
-            if (hasattr(col, 'type') and
-                    isinstance(col.type, sqlalchemy.Boolean)):
-                col_info["bool"] = True
-            col_info.setdefault("css_class", "column-%s" % col_name)
-            yield col_info
+                    name = col.__name__
+                    obj = target = col
+                    kind = ListColumn.CALLABLE
+                info = cls._get_head_info(obj, name)
+                if 'expression' in info:
+                    kind, target = ListColumn.EXPRESSION, info['expression']
+                columns.append(ListColumn(name, kind, target, info))
+
+            if list_display_links is None:
+                links = frozenset([0]) if columns else frozenset()
+            else:
+                links = frozenset(index for index, col in enumerate(columns)
+                                  if col.name in list_display_links)
+            compiled = CompiledListDisplay(
+                tuple(columns), tuple(col.info for col in columns), links)
+            cls._list_columns_cache[key] = compiled
+        return compiled
+
+    @reify
+    def _list_display(self):
+        """
+        The :class:`CompiledListDisplay` for the current configuration.
+        """
+        links = getattr(self, 'list_display_links', None)
+        return self._compile_list_display(self.list_display, links)
+
+    @property
+    def _list_links(self):
+        """
+        A :class:`frozenset` of the positions of all columns that should link
+        to the edit view. Templates can check a column with
+        ``index in view._list_links``.
+        """
+        return self._list_display.links
+
+    @reify
+    def _list_columns(self):
+        """
+        A tuple of ``(name, accessor)`` pairs for each column of the list
+        view bound to this view instance.
+        """
+        columns = []
+        for col in self._list_display.columns:
+            if col.batch:
+                getter = functools.partial(self._get_batch_value, col.name)
+            else:
+                getter = col.bind(self)
+            columns.append((col.name, getter))
+        return tuple(columns)
+
+    @reify
+    def _list_batch_values(self):
+        """
+        The values of all batch columns (see :ref:`list_display
+        <list_display>`) for the current page. Each batch callable is called
+        once with all items on the page and the result is stored as a
+        dictionary mapping the column name to the returned mapping.
+        """
+        return self._get_batch_values(self._list_page.items)
+
+    def _get_batch_values(self, items):
+        """
+        Call each batch column with ``items`` and return a dictionary
+        mapping the column names to the returned mappings.
+        """
+        return dict((col.name, col.bind(self)(items))
+                    for col in self._list_display.columns if col.batch)
+
+    def _get_batch_value(self, name, obj):
+        """
+        Get the value of the batch column ``name`` for ``obj`` from
+        :attr:`_list_batch_values`. If the batch callable returned no value
+        for the object, ``None`` is returned.
+        """
+        return self._list_batch_values[name].get(self._get_item_key(obj))
+
+    def _get_item_key(self, obj):
+        """
+        Get the primary key of ``obj``, a tuple if the model has multiple
+        primary keys.
+        """
+        names = get_pk_info(self.Form.Meta.model).names
+        if len(names) == 1:
+            return getattr(obj, names[0])
+        return tuple(getattr(obj, name) for name in names)
+
+    def _get_list_expressions(self):
+        """
+        Get the SQL expressions of all expression columns (see
+        :ref:`list_display <list_display>`), each labeled with the name of
+        its column. They are added to the query of the list view so that
+        the database computes them together with the items.
+        """
+        return [col.target.label(col.name)
+                for col in self._list_display.columns
+                if col.kind == ListColumn.EXPRESSION]
+
+    @reify
+    def _list_expression_values(self):
+        """
+        The values of all expression columns for the current page. It maps
+        each column name to a dictionary of primary keys and values and is
+        populated by :meth:`_process_list_rows` when the page is loaded.
+        """
+        return dict((col.name, {}) for col in self._list_display.columns
+                    if col.kind == ListColumn.EXPRESSION)
+
+    def _process_list_rows(self, rows):
+        """
+        Split the rows of the list query into items and the values of the
+        expression columns which are stored in
+        :attr:`_list_expression_values`.
+
+        :return: The list of items.
+        """
+        names = [col.name for col in self._list_display.columns
+                 if col.kind == ListColumn.EXPRESSION]
+        values = self._list_expression_values
+        items = []
+        for row in rows:
+            item = row[0]
+            key = self._get_item_key(item)
+            for name, value in zip(names, row[1:]):
+                values[name][key] = value
+            items.append(item)
+        return items
+
+    def _get_list_process(self):
+        """
+        Get the callable that turns the rows of the list query into items
+        or ``None`` if the rows are the items. This is
+        :meth:`_process_list_rows` if there are expression columns and the
+        view is not in :ref:`read-only mode <list_readonly>`.
+        """
+        if self.list_readonly or not self._get_list_expressions():
+            return None
+        return self._process_list_rows
+
+    def _get_expression_value(self, name, obj):
+        """
+        Get the value of the expression column ``name`` for ``obj``. If
+        ``obj`` is not on the current page, ``None`` is returned.
+        """
+        values = self._list_expression_values[name]
+        key = self._get_item_key(obj)
+        if key not in values:
+            # Loading the page populates the values
+            self._list_page.items
+        return values.get(key)
 
     def iter_list_cols(self, obj):
         """
@@ -782,27 +1882,611 @@ class CRUDView(object):
         a single row in the list view. It uses the ``list_display`` option to
         determine the columns.
         """
-        for col in self.list_display:
-            title = col
-            if callable(title):
-                title = title.__name__
-            if isinstance(col, (six.text_type, six.binary_type)):
-                if hasattr(obj, col):
-                    col = getattr(obj, col)
-                    if callable(col):
-                        col = col()
-                # column on view
-                else:
-                    col = getattr(self, col)
-                    if callable(col):
-                        col = col(obj)
-            # must be a separate callable
-            else:
-                col = col(obj)
-            yield title, col
+        for title, getter in self._list_columns:
+            yield title, getter(obj)
 
     def get_list_query(self):
-        return self.dbsession.query(self.Form.Meta.model)
+        """
+        Get the query selecting all items for the list view. Ordering and
+        pagination are applied separately by the list view so you can override
+        this method to restrict the listed items. Only the columns required by
+        the list view are loaded, see
+        :ref:`list_load_columns <list_load_columns>`. In
+        :ref:`read-only mode <list_readonly>` rows are selected instead of
+        instances, see :meth:`_get_list_row_query`.
+        """
+        if self.list_readonly:
+            query = self._get_list_row_query()
+        else:
+            query = self.dbsession.query(self.Form.Meta.model)
+            load_columns = self._get_list_load_columns()
+            if load_columns is not None:
+                query = query.options(load_only(*load_columns))
+            eager_loads = self._get_list_eager_loads()
+            if eager_loads:
+                query = query.options(*eager_loads)
+        query = self._apply_list_filters(query)
+        return self._apply_list_search(query)
+
+    def _get_list_row_query(self):
+        """
+        Get the query of the list view in :ref:`read-only mode
+        <list_readonly>`. It selects the primary keys, the plain columns of
+        :ref:`list_display <list_display>` and those in
+        :ref:`list_load_columns <list_load_columns>` as rows. Each path of
+        relationships is joined with an outer join and its column is
+        selected with the name of the path as label.
+
+        :raises ValueError: If an entry of ``list_display`` cannot be
+            computed from a row, i.e. a method of the model (such as the
+            default ``__str__``) or an attribute that is not a column.
+        """
+        Model = self.Form.Meta.model
+        column_attrs = inspect(Model).column_attrs
+        names = list(get_pks(Model))
+        paths = []
+        for col in self._list_display.columns:
+            if col.kind == ListColumn.MODEL_ATTRIBUTE:
+                if col.target not in column_attrs:
+                    raise ValueError("Attribute '%s' is not a column and "
+                                     "cannot be displayed in read-only mode"
+                                     % col.name)
+                names.append(col.target)
+            elif col.kind == ListColumn.MODEL_METHOD:
+                raise ValueError("Method '%s' of the model cannot be "
+                                 "displayed in read-only mode" % col.name)
+            elif col.kind == ListColumn.PATH:
+                paths.append(col)
+        names.extend(self.list_load_columns or ())
+        columns = []
+        for name in names:
+            if name not in columns:
+                columns.append(name)
+        query = self.dbsession.query(*[getattr(Model, name)
+                                       for name in columns])
+        joined = {}
+        for col in paths:
+            entity = Model
+            for index, key in enumerate(col.target[:-1]):
+                path = col.target[:index + 1]
+                if path not in joined:
+                    attribute = getattr(entity, key)
+                    target = aliased(attribute.property.mapper.class_)
+                    query = query.outerjoin(target, attribute)
+                    joined[path] = target
+                entity = joined[path]
+            attribute = getattr(entity, col.target[-1])
+            if not isinstance(getattr(attribute, 'property', None),
+                              ColumnProperty):
+                raise ValueError("Path '%s' does not end in a column and "
+                                 "cannot be displayed in read-only mode"
+                                 % col.name)
+            query = query.add_columns(attribute.label(col.name))
+        return query
+
+    def _get_search_term(self):
+        """
+        Get the search term from the ``q`` parameter of the query string or
+        an empty string if there is none.
+        """
+        return self.request.GET.get('q', '').strip()
+
+    def _apply_list_search(self, query):
+        """
+        Restrict ``query`` to the items matching the search term using the
+        :ref:`search_backend <search_backend>`.
+        """
+        term = self._get_search_term()
+        if not self.search_fields or not term:
+            return query
+        return self.search_backend.apply(query, self.Form.Meta.model,
+                                         tuple(self.search_fields), term)
+
+    @classmethod
+    def _compile_list_filter(cls, list_filter):
+        """
+        Turn the entries of :ref:`list_filter <list_filter>` into instances
+        of :class:`.filters.Filter`. This is only done once per view class and
+        value of ``list_filter``.
+
+        :return: A tuple of filters.
+        """
+        key = tuple(list_filter)
+        filters = cls._list_filters_cache.get(key)
+        if filters is None:
+            model = cls.Form.Meta.model
+            filters = tuple(entry if isinstance(entry, Filter)
+                            else get_filter(model, entry)
+                            for entry in list_filter)
+            cls._list_filters_cache[key] = filters
+        return filters
+
+    @reify
+    def _list_filters(self):
+        """
+        The filters of the list view, see :meth:`_compile_list_filter`.
+        """
+        return self._compile_list_filter(self.list_filter)
+
+    @reify
+    def _list_filter_values(self):
+        """
+        The values of all active filters of the current request as a list of
+        ``(filter, value)`` tuples.
+        """
+        model = self.Form.Meta.model
+        values = []
+        for filter_ in self._list_filters:
+            value = filter_.get_value(model, self.request.GET)
+            if value is not None:
+                values.append((filter_, value))
+        return values
+
+    def _apply_list_filters(self, query):
+        """
+        Restrict ``query`` with all active filters.
+        """
+        model = self.Form.Meta.model
+        for filter_, value in self._list_filter_values:
+            query = filter_.apply(query, model, value)
+        return query
+
+    def iter_list_filters(self):
+        """
+        Get an iterable of the filters for the list view template. Each
+        element is a tuple of the :class:`.filters.Filter`, its label, a
+        list of the current values of its parameters in the query string (see
+        :attr:`.filters.Filter.params`) and a list of its options. Each
+        option is a tuple of the value, its label and the number of matching
+        items or ``None`` if :ref:`list_facets <list_facets>` is disabled.
+        """
+        model = self.Form.Meta.model
+        for filter_ in self._list_filters:
+            values = [self.request.GET.get(param, '')
+                      for param in filter_.params]
+            counts = None
+            if self.list_facets:
+                counts = self._get_facet_counts(filter_)
+            options = []
+            for value, label in filter_.get_options(self):
+                count = None
+                if counts is not None:
+                    count = counts.get(value, 0)
+                options.append((value, label, count))
+            yield filter_, filter_.get_label(model), values, options
+
+    def _get_facet_counts(self, filter_):
+        """
+        Count the items of the current list query for each option of
+        ``filter_`` with a single ``GROUP BY`` query. The result is cached
+        according to :ref:`list_facets_cache_ttl <list_facets_cache_ttl>`.
+
+        :return: A dictionary mapping option values to the number of items
+            or ``None`` if the filter has no facets.
+        """
+        column = filter_.get_facet_column(self.Form.Meta.model)
+        if column is None:
+            return None
+        query = (self.get_list_query().
+                 order_by(None).
+                 with_entities(column, func.count()).
+                 group_by(column))
+        ttl = self.list_facets_cache_ttl
+        key = None
+        if ttl:
+            compiled = query.statement.compile()
+            key = (filter_.name, six.text_type(compiled),
+                   tuple(sorted(compiled.params.items())))
+            try:
+                counts = self._list_facets_cache.get(key)
+            except TypeError:
+                # Parameters that cannot be hashed are not cached
+                key = counts = None
+            if counts is not None:
+                return counts
+        counts = dict((filter_.format_value(value), count)
+                      for value, count in query if value is not None)
+        if key is not None:
+            self._list_facets_cache.set(key, counts, ttl)
+        return counts
+
+    def _iter_list_relationships(self):
+        """
+        Iterate over the relationships displayed on the list view. For each
+        column that is a relationship or a path of relationships (see
+        :ref:`list_display <list_display>`), a list of the relationship
+        attributes along it is yielded.
+        """
+        Model = self.Form.Meta.model
+        relationship_names = inspect(Model).relationships.keys()
+        for col in self._list_display.columns:
+            if col.kind == ListColumn.PATH:
+                attributes = _resolve_path(Model, col.target)
+            elif (col.kind == ListColumn.MODEL_ATTRIBUTE and
+                    col.target in relationship_names):
+                attributes = [getattr(Model, col.target)]
+            else:
+                continue
+            relationships = []
+            for attribute in attributes:
+                prop = getattr(attribute, 'property', None)
+                if not isinstance(prop, RelationshipProperty):
+                    break
+                relationships.append(attribute)
+            if relationships:
+                yield relationships
+
+    def _get_list_eager_loads(self):
+        """
+        Get the loader options that eagerly load all relationships displayed
+        on the list view so that a page does not issue a query for each of its
+        rows. Single objects are loaded with a join
+        (:func:`sqlalchemy.orm.joinedload`) while collections are loaded with
+        a single additional query (:func:`sqlalchemy.orm.selectinload`).
+
+        :return: A list of loader options for
+            :meth:`sqlalchemy.orm.query.Query.options`.
+        """
+        options = []
+        seen = set()
+        for relationships in self._iter_list_relationships():
+            path = tuple(attribute.key for attribute in relationships)
+            if path in seen:
+                continue
+            seen.add(path)
+            option = None
+            for attribute in relationships:
+                if attribute.property.uselist:
+                    loader = selectinload
+                else:
+                    loader = joinedload
+                if option is not None:
+                    # Chain the loader onto the previous relationship
+                    loader = getattr(option, loader.__name__)
+                option = loader(attribute)
+            options.append(option)
+        return options
+
+    def _get_list_load_columns(self):
+        """
+        Get the names of the columns to load for the list view, see
+        :ref:`list_load_columns <list_load_columns>`.
+
+        :return: A list of column names or ``None`` if all columns should be
+            loaded.
+        """
+        Model = self.Form.Meta.model
+        mapper = inspect(Model)
+        columns = self._list_display.columns
+        names = []
+        handled = 0
+        for col in columns:
+            if (col.kind == ListColumn.MODEL_ATTRIBUTE and
+                    col.target in mapper.column_attrs):
+                names.append(col.target)
+                handled += 1
+            # Computed by the database and thus do not need any columns
+            elif col.kind == ListColumn.EXPRESSION:
+                handled += 1
+        # Relationships need their local columns to be loaded
+        for relationships in self._iter_list_relationships():
+            local_columns = relationships[0].property.local_columns
+            names.extend(attr.key for attr in mapper.column_attrs
+                         if local_columns.intersection(attr.columns))
+            handled += 1
+        if self.list_load_columns is not None:
+            names.extend(self.list_load_columns)
+        elif handled != len(columns):
+            return None
+        load_columns = []
+        for name in get_pks(Model) + names:
+            if name not in load_columns:
+                load_columns.append(name)
+        return load_columns
+
+    def _get_list_order(self):
+        """
+        Get the criteria by which the list view is ordered. These are appended
+        to any ordering already present on :meth:`get_list_query`. The
+        columns requested in the ``order`` parameter of the query string (see
+        :attr:`_list_order_params`) come first and the primary keys are
+        always added at the end which makes the ordering deterministic and
+        thus pages stable. The primary keys use the direction of the last
+        requested column so a single index can serve the whole ordering.
+
+        :return: A list of :class:`.SortKey` instances.
+        """
+        Model = self.Form.Meta.model
+        sortable = self._list_sortable_columns
+        keys = []
+        for name, descending in self._list_order_params:
+            expression, getter = sortable[name]
+            keys.append(SortKey(expression, descending, getter))
+        descending = keys[-1].descending if keys else False
+        requested = set(name for name, _ in self._list_order_params)
+        for pk in get_pks(Model):
+            if pk not in requested:
+                keys.append(SortKey(getattr(Model, pk), descending,
+                                    operator.attrgetter(pk)))
+        return keys
+
+    @reify
+    def _list_sortable_columns(self):
+        """
+        The columns of the list view that can be sorted by. These are all
+        columns of :ref:`list_display <list_display>` that are plain columns
+        of the model or SQL expressions. It maps each column name to a tuple
+        of the expression to order by and a getter suitable for
+        :class:`.SortKey`.
+        """
+        Model = self.Form.Meta.model
+        column_attrs = inspect(Model).column_attrs
+        sortable = OrderedDict()
+        for col in self._list_display.columns:
+            if (col.kind == ListColumn.MODEL_ATTRIBUTE and
+                    col.target in column_attrs):
+                sortable[col.name] = (getattr(Model, col.target),
+                                      operator.attrgetter(col.target))
+            elif col.kind == ListColumn.EXPRESSION:
+                sortable[col.name] = (col.target, col.bind(self))
+        return sortable
+
+    @reify
+    def _list_order_params(self):
+        """
+        The ordering requested by the ``order`` parameter of the query string
+        as a list of ``(name, descending)`` tuples. The parameter is a comma
+        separated list of column names, each optionally prefixed with ``-``
+        for a descending order, e.g. ``?order=title,-id``. Only columns in
+        :attr:`_list_sortable_columns` are accepted, everything else is
+        ignored.
+        """
+        sortable = self._list_sortable_columns
+        params = []
+        seen = set()
+        for name in self.request.GET.get('order', '').split(','):
+            name = name.strip()
+            descending = name.startswith('-')
+            if descending:
+                name = name[1:]
+            if name in sortable and name not in seen:
+                seen.add(name)
+                params.append((name, descending))
+        return params
+
+    def _get_column_order(self, index):
+        """
+        Get the sorting information for the heading of a column of the list
+        view.
+
+        :param index: The position of the column in
+            :ref:`list_display <list_display>`.
+
+        :return: ``None`` if the column cannot be sorted. Otherwise a tuple
+            of a URL that sorts the list by this column and the current
+            direction of the column, ``'asc'`` or ``'desc'`` if the list is
+            primarily sorted by this column and ``None`` otherwise. The URL
+            reverses the direction if the list is already sorted ascending by
+            this column.
+        """
+        name = self._list_display.columns[index].name
+        if name not in self._list_sortable_columns:
+            return None
+        current = None
+        params = self._list_order_params
+        if params and params[0][0] == name:
+            current = 'desc' if params[0][1] else 'asc'
+        order = '-' + name if current == 'asc' else name
+        url = self._list_route(order=order, page=None, cursor=None)
+        return url, current
+
+    def _get_page_number(self):
+        """
+        Get the number of the requested page from the ``page`` parameter in
+        the query string. Missing or invalid values result in the first page.
+        """
+        try:
+            page = int(self.request.GET.get('page', 1))
+        except (TypeError, ValueError):
+            return 1
+        return max(page, 1)
+
+    @reify
+    def _list_page(self):
+        """
+        The page of items to be displayed on the list view for the current
+        request, either a :class:`.Page` or :class:`.KeysetPage` depending on
+        :ref:`list_pagination <list_pagination>`.
+        """
+        keys = self._get_list_order()
+        query = self.get_list_query()
+        expressions = self._get_list_expressions()
+        if expressions:
+            query = query.add_columns(*expressions)
+        process = self._get_list_process()
+        if self.list_pagination == 'keyset':
+            cursor = self.request.GET.get('cursor')
+            return KeysetPage(query, keys, self.list_per_page, cursor,
+                              process)
+        elif self.list_pagination == 'offset':
+            query = query.order_by(*[key.clause for key in keys])
+            return Page(query, self._get_page_number(), self.list_per_page,
+                        process, self.list_count)
+        else:
+            raise ValueError("Unknown pagination '%s'" % self.list_pagination)
+
+    def _get_export_query(self):
+        """
+        Get the query for the export view. It is the query of the list view
+        with the expression columns, ordered like the list view.
+        """
+        query = self.get_list_query()
+        expressions = self._get_list_expressions()
+        if expressions:
+            query = query.add_columns(*expressions)
+        keys = self._get_list_order()
+        return query.order_by(*[key.clause for key in keys])
+
+    def _iter_export_batches(self):
+        """
+        Load the items of the export view batch by batch (see
+        :func:`.util.iter_batches`). For each batch a list of rows is yielded
+        where each row is a list of the values of all columns of
+        :ref:`list_display <list_display>` for one item. Batch columns are
+        called once for each batch and the items are removed from the
+        session after their batch has been written.
+        """
+        process = self._get_list_process()
+        query = self._get_export_query()
+        for batch in iter_batches(query, self.list_export_batch_size):
+            items = batch if process is None else process(batch)
+            self._list_batch_values = self._get_batch_values(items)
+            yield [[value for _, value in self.iter_list_cols(item)]
+                   for item in items]
+            for values in self._list_expression_values.values():
+                values.clear()
+
+    def _iter_export(self, format_):
+        """
+        Generate the body of the export view in ``format_`` as a sequence of
+        byte strings. The CSV header is yielded before the query is executed
+        so the client receives data immediately.
+        """
+        if format_ == 'csv':
+            labels = [info['label'] for info in self._list_display.head]
+            yield _format_csv([labels])
+            for rows in self._iter_export_batches():
+                yield _format_csv(rows)
+        else:
+            names = [col.name for col in self._list_display.columns]
+            for rows in self._iter_export_batches():
+                yield _format_ndjson(names, rows)
+
+    def export(self):
+        """
+        Export all items of the list view that match the current filters
+        and search term in the format given by the ``format`` placeholder of
+        the route (see :ref:`list_export <list_export>`).
+
+        The body of the returned response is a generator, so the items are
+        only loaded while the response is sent, i.e. after this method has
+        returned. The database session must still be usable at that point.
+
+        :return: A :class:`pyramid.response.Response`.
+
+        :raises pyramid.httpexceptions.HTTPNotFound: If the format is not
+            in ``list_export``.
+        """
+        format_ = self.request.matchdict.get('format')
+        if format_ not in self.list_export or format_ not in _EXPORT_TYPES:
+            raise HTTPNotFound()
+        response = self.request.response
+        filename = '%s.%s' % (self.Form.Meta.model.__name__.lower(), format_)
+        app_iter = self._iter_export(format_)
+        compression = self._get_export_compression()
+        if compression == 'file':
+            response.content_type = 'application/gzip'
+            filename += '.gz'
+        else:
+            response.content_type = _EXPORT_TYPES[format_]
+            if format_ == 'csv':
+                response.charset = 'utf-8'
+            if compression == 'content-encoding':
+                response.content_encoding = 'gzip'
+        if compression is not None:
+            app_iter = _gzip_stream(app_iter, self.list_export_buffer_size)
+        if self.list_export_compress:
+            response.vary = ('Accept-Encoding',)
+        response.content_disposition = 'attachment; filename="%s"' % filename
+        response.app_iter = app_iter
+        return response
+
+    def _get_export_compression(self):
+        """
+        Determine whether and how the export view compresses its response
+        (see :ref:`list_export_compress <list_export_compress>`).
+
+        :return: ``'file'`` if a gzip file was requested with the
+            ``compress=1`` parameter, ``'content-encoding'`` if the client
+            accepts the ``gzip`` content coding and ``None`` if the response
+            is not compressed.
+        """
+        if not self.list_export_compress:
+            return None
+        if self.request.GET.get('compress') == '1':
+            return 'file'
+        header = self.request.headers.get('Accept-Encoding')
+        if not header:
+            return None
+        accept = create_accept_encoding_header(header)
+        if accept.acceptable_offers(['gzip']):
+            return 'content-encoding'
+        return None
+
+    def _get_list_rows_renderer(self):
+        """
+        Get the renderer name of the ``list_rows`` def of the list template
+        that renders the rows of the table in streaming mode (see
+        :ref:`list_stream <list_stream>`).
+        """
+        name, ext = self.get_template_for('list').rsplit('.', 1)
+        return '%s#list_rows.%s' % (name, ext)
+
+    def _stream_list(self, ActionForm):
+        """
+        Render the list view as a streamed response. The template is
+        rendered without rows but with a marker in their place. The part
+        before the marker is sent first, then the rows are rendered in
+        batches as they are fetched from the cursor (see
+        :meth:`.Page.iter_batches`) and finally the rest of the page is
+        sent.
+
+        The rows are only loaded after this method has returned, so the
+        database session must still be usable while the response is sent.
+        This is not the case if the transaction is ended when the view
+        returns (e.g. by ``pyramid_tm``), see
+        :ref:`list_stream <list_stream>`.
+
+        :return: A :class:`pyramid.response.Response` with a generator as
+            its body.
+        """
+        marker = '<!-- pyramid_crud:list_rows -->'
+        action_form = ActionForm(self.request.POST, csrf_context=self.request)
+        data = {'items': [], 'page': self._list_page,
+                'action_form': action_form, 'view': self,
+                'stream_marker': marker}
+        html = render(self.get_template_for('list'), data,
+                      request=self.request)
+        head, tail = html.split(marker, 1)
+        response = self.request.response
+        response.content_type = 'text/html'
+        response.charset = 'utf-8'
+        response.app_iter = self._iter_list_stream(head, tail, action_form)
+        return response
+
+    def _iter_list_stream(self, head, tail, action_form):
+        """
+        Generate the body of a streamed list view (see :meth:`_stream_list`)
+        as a sequence of byte strings. Batch columns are called once for
+        each batch of ``list_stream_batch_size`` items.
+        """
+        yield head.encode('utf-8')
+        renderer = self._get_list_rows_renderer()
+        field = action_form.items
+        index = 0
+        for items in self._list_page.iter_batches(self.list_stream_batch_size):
+            self._list_batch_values = self._get_batch_values(items)
+            field.choices = self._get_item_choices(items)
+            checkboxes = list(field)
+            # Keep the ids of the checkboxes unique across batches
+            for checkbox in checkboxes:
+                checkbox.id = '%s-%d' % (field.id, index)
+                index += 1
+            data = {'items': items, 'checkboxes': checkboxes, 'view': self}
+            yield render(renderer, data, request=self.request).encode('utf-8')
+            for values in self._list_expression_values.values():
+                values.clear()
+        yield tail.encode('utf-8')
 
     # Actual admin views
 
@@ -811,43 +2495,58 @@ class CRUDView(object):
         List all items for a Model. This is the default view that can be
         overridden by subclasses to change its behavior.
 
-        :return: A dict with a single key ``items`` that is a query which when
-            iterating over yields all items to be listed.
+        :return: A dict with the key ``items`` that is a list of all items on
+            the current page, the key
+            ``page`` holding the :class:`.Page` that describes the current
+            page and the key ``action_form``. If
+            :ref:`list_stream <list_stream>` is enabled, the page is instead
+            returned as a streamed response, see :meth:`_stream_list`.
         """
         ActionForm = self.get_action_form()
-        action_form = ActionForm(self.request.POST, csrf_context=self.request)
-        items = self.get_list_query()
-        retparams = {'items': items, 'action_form': action_form}
-
-        if self.request.method == 'POST':
-            redirect = self.redirect(self.routes['list'])
-            Model = self.Form.Meta.model
-            pk_names = get_pks(Model)
-            if len(pk_names) != 1:  # pragma: no cover (covered above already)
-                raise ValueError("Only single primary keys supported right "
-                                 "now")
-            pk = getattr(Model, pk_names[0])
-            value_list = action_form.items.data
-            if not action_form.validate():
-                flash = self.request.session.flash
-                if 'csrf_token' not in action_form.errors:
-                    if 'items' in action_form.errors:
-                        for msg in action_form.errors['items']:
-                            flash(msg, 'error')
-
-                    if 'action' in action_form.errors:
-                        for msg in action_form.errors['action']:
-                            flash(msg, 'error')
-                return retparams
-
-            action = self._all_actions[action_form.action.data]
-            query = self.dbsession.query(Model).filter(pk.in_(value_list))
-            success, response = action["func"](query)
-            if success:
-                return response or redirect
-            else:
-                raise response or redirect
-        return retparams
+        page = self._list_page
+
+        if self.request.method != 'POST':
+            if self.list_stream:
+                return self._stream_list(ActionForm)
+            action_form = ActionForm(self.request.POST,
+                                     csrf_context=self.request,
+                                     item_choices=self._get_item_choices())
+            return {'items': page.items, 'page': page,
+                    'action_form': action_form}
+
+        # Selected items are validated by looking them up directly, so the
+        # current page only needs to be loaded if the form is displayed again.
+        action_form = ActionForm(self.request.POST, csrf_context=self.request,
+                                 lookup=self._lookup_items)
+        redirect = self.redirect(self.routes['list'])
+        Model = self.Form.Meta.model
+        pk_names = get_pks(Model)
+        if len(pk_names) != 1:  # pragma: no cover (covered above already)
+            raise ValueError("Only single primary keys supported right "
+                             "now")
+        pk = getattr(Model, pk_names[0])
+        value_list = action_form.items.data
+        if not action_form.validate():
+            flash = self.request.session.flash
+            if 'csrf_token' not in action_form.errors:
+                if 'items' in action_form.errors:
+                    for msg in action_form.errors['items']:
+                        flash(msg, 'error')
+
+                if 'action' in action_form.errors:
+                    for msg in action_form.errors['action']:
+                        flash(msg, 'error')
+            action_form.items.choices = self._get_item_choices()
+            return {'items': page.items, 'page': page,
+                    'action_form': action_form}
+
+        action = self._all_actions[action_form.action.data]
+        query = self.dbsession.query(Model).filter(pk.in_(value_list))
+        success, response = action["func"](query)
+        if success:
+            return response or redirect
+        else:
+            raise response or redirect
 
     def edit(self):
         """
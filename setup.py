@@ -18,7 +18,7 @@ requires = [
     'pyramid',  # framework
     'Mako',  # templating
     'pyramid_mako',  # templating
-    'SQLAlchemy>=0.8',  # database
+    'SQLAlchemy>=1.2',  # database
     'wtforms_alchemy',  # forms
     'WTForms',  # forms
     'six',
@@ -0,0 +1,147 @@
+from pyramid_crud.filters import (Filter, BooleanFilter, ChoiceFilter,
+                                  DateRangeFilter, RelationshipFilter,
+                                  get_filter)
+from sqlalchemy import (Column, String, Integer, Boolean, Date, DateTime,
+                        Enum, ForeignKey, event)
+from sqlalchemy.orm import relationship
+from datetime import date, datetime
+from webob.multidict import MultiDict
+import pytest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+
+class TestFilters(object):
+
+    @pytest.fixture(autouse=True)
+    def _prepare(self, model_factory, DBSession):
+        self.Author = model_factory([Column('name', String)], 'Author')
+        self.Author.__str__ = lambda self: self.name or ''
+        cols = [Column('text', String, info={'label': 'Text'}),
+                Column('status', Enum('new', 'done', name='status')),
+                Column('flag', Boolean),
+                Column('day', Date),
+                Column('created', DateTime),
+                Column('count', Integer),
+                Column('author_id', ForeignKey('author.id'))]
+        rels = {'author': relationship(self.Author)}
+        self.Model = model_factory(cols, relationships=rels)
+        self.session = DBSession
+        self.view = MagicMock()
+        self.view.Form.Meta.model = self.Model
+        self.view.dbsession = DBSession
+
+    def add(self, **kw):
+        obj = self.Model()
+        for key, value in kw.items():
+            setattr(obj, key, value)
+        self.session.add(obj)
+        self.session.flush()
+        return obj
+
+    def filtered(self, filter_, **params):
+        value = filter_.get_value(self.Model, MultiDict(params))
+        query = self.session.query(self.Model).order_by(self.Model.id)
+        if value is not None:
+            query = filter_.apply(query, self.Model, value)
+        return [obj.id for obj in query]
+
+    @pytest.mark.parametrize('name, cls', [
+        ('text', ChoiceFilter),
+        ('status', ChoiceFilter),
+        ('flag', BooleanFilter),
+        ('day', DateRangeFilter),
+        ('created', DateRangeFilter),
+        ('author', RelationshipFilter),
+    ])
+    def test_get_filter(self, name, cls):
+        filter_ = get_filter(self.Model, name)
+        assert type(filter_) is cls
+        assert filter_.name == name
+
+    @pytest.mark.parametrize('name', ['missing', '__str__'])
+    def test_get_filter_invalid(self, name):
+        with pytest.raises(AttributeError):
+            get_filter(self.Model, name)
+
+    def test_label(self):
+        assert Filter('text').get_label(self.Model) == 'Text'
+        assert Filter('author_id').get_label(self.Model) == 'Author Id'
+        assert Filter('text', 'Foo').get_label(self.Model) == 'Foo'
+
+    def test_boolean(self):
+        self.add(flag=True)
+        self.add(flag=False)
+        self.add()
+        filter_ = BooleanFilter('flag')
+        assert self.filtered(filter_, flag='1') == [1]
+        assert self.filtered(filter_, flag='0') == [2]
+        assert self.filtered(filter_, flag='x') == [1, 2, 3]
+        assert filter_.get_options(self.view) == [('1', 'Yes'), ('0', 'No')]
+
+    def test_choice(self):
+        for count in [3, 1, None, 3]:
+            self.add(count=count)
+        filter_ = ChoiceFilter('count')
+        assert self.filtered(filter_, count='3') == [1, 4]
+        assert self.filtered(filter_, count='foo') == [1, 2, 3, 4]
+        assert self.filtered(filter_) == [1, 2, 3, 4]
+        assert filter_.get_options(self.view) == [('1', '1'), ('3', '3')]
+
+    def test_choice_enum(self):
+        filter_ = ChoiceFilter('status')
+        assert filter_.get_options(self.view) == [('new', 'new'),
+                                                  ('done', 'done')]
+
+    def test_choice_explicit(self):
+        filter_ = ChoiceFilter('text', choices=[('a', 'A')])
+        assert filter_.get_options(self.view) == [('a', 'A')]
+
+    def test_date_range(self):
+        for day in [1, 2, 3]:
+            self.add(day=date(2014, 1, day))
+        filter_ = DateRangeFilter('day')
+        assert filter_.params == ['day__gte', 'day__lte']
+        assert self.filtered(filter_, day__gte='2014-01-02') == [2, 3]
+        assert self.filtered(filter_, day__lte='2014-01-02') == [1, 2]
+        assert self.filtered(filter_, day__gte='2014-01-02',
+                             day__lte='2014-01-02') == [2]
+        assert self.filtered(filter_, day__gte='foo') == [1, 2, 3]
+
+    def test_date_range_datetime(self):
+        self.add(created=datetime(2014, 1, 1, 23, 59))
+        self.add(created=datetime(2014, 1, 2, 0, 0))
+        filter_ = DateRangeFilter('created')
+        assert self.filtered(filter_, created__lte='2014-01-01') == [1]
+        assert self.filtered(filter_, created__gte='2014-01-02') == [2]
+
+    def test_relationship(self):
+        authors = [self.Author(), self.Author(), self.Author()]
+        for index, author in enumerate(authors):
+            author.name = 'Author %d' % index
+        self.session.add_all(authors)
+        self.session.flush()
+        self.add(author=authors[2])
+        self.add(author=authors[0])
+        self.add(author=authors[2])
+        filter_ = RelationshipFilter('author')
+        assert self.filtered(filter_, author=str(authors[2].id)) == [1, 3]
+        assert filter_.get_options(self.view) == [
+            (str(authors[0].id), 'Author 0'),
+            (str(authors[2].id), 'Author 2')]
+
+    def test_relationship_options_single_query(self):
+        self.add(author=self.Author())
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        engine = self.session.get_bind()
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            RelationshipFilter('author').get_options(self.view)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        assert len(statements) == 1
@@ -1181,6 +1181,40 @@ class TestMultiField(object):
         assert 'items does not exist anymore' in err_msg
 
 
+class TestMultiFieldLookup(object):
+
+    @pytest.fixture(autouse=True, params=[fields.MultiCheckboxField,
+                                          fields.MultiHiddenField])
+    def _prepare(self, request):
+        self.lookup = MagicMock(return_value=set(['1', '5']))
+
+        class Form(wtforms.Form):
+            items = request.param(choices=[], lookup=self.lookup)
+        self.Form = Form
+
+    def test_valid(self):
+        formdata = MultiDict()
+        formdata.add('items', '1')
+        formdata.add('items', '5')
+        form = self.Form(formdata)
+        assert form.validate()
+        self.lookup.assert_called_once_with(['1', '5'])
+
+    def test_invalid(self):
+        formdata = MultiDict()
+        formdata.add('items', '1')
+        formdata.add('items', '3')
+        form = self.Form(formdata)
+        assert not form.validate()
+        [err_msg] = form.errors['items']
+        assert 'items does not exist anymore' in err_msg
+
+    def test_no_value(self):
+        form = self.Form(MultiDict())
+        assert form.validate()
+        assert not self.lookup.called
+
+
 class TestMultiCheckboxField(object):
 
     @pytest.fixture(autouse=True)
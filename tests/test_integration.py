@@ -56,18 +56,18 @@ class TestMinimal(object):
 
     def test_minimal_list(self, minimal_view, pyramid_request):
         result = minimal_view(pyramid_request).list()
-        assert len(result) == 2
+        assert len(result) == 3
         assert 'action_form' in result
-        assert result['items'].all() == []
+        assert result['items'] == []
 
     def test_minimal_list_items(self, minimal_view, pyramid_request, DBSession,
                                 minimal_model):
         DBSession.add_all([minimal_model(), minimal_model()])
         DBSession.flush()
         result = minimal_view(pyramid_request).list()
-        assert len(result) == 2
+        assert len(result) == 3
         assert 'action_form' in result
-        items = result['items'].all()
+        items = result['items']
         assert len(items) == 2
         for item in items:
             assert item.id
@@ -0,0 +1,376 @@
+from pyramid_crud.pagination import (Page, KeysetPage, SortKey, ExactCount,
+                                     CachedCount, ApproximateCount)
+from sqlalchemy import (Column, Integer, Boolean, DateTime, Date, Numeric,
+                        String, Time, Interval, Enum, CHAR, MetaData, Table)
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+from operator import attrgetter
+import base64
+import enum
+import json
+import uuid
+import pytest
+
+
+class TestPage(object):
+
+    @pytest.fixture(autouse=True)
+    def _prepare(self, Model_one_pk, DBSession):
+        self.Model = Model_one_pk
+        self.session = DBSession
+        self.session.add_all([self.Model() for _ in range(7)])
+        self.session.flush()
+        self.query = self.session.query(self.Model).order_by(self.Model.id)
+
+    def test_items(self):
+        page = Page(self.query, 2, 3)
+        assert [item.id for item in page.items] == [4, 5, 6]
+
+    def test_items_last_page(self):
+        page = Page(self.query, 3, 3)
+        assert [item.id for item in page.items] == [7]
+
+    def test_items_out_of_range(self):
+        page = Page(self.query, 10, 3)
+        assert list(page.items) == []
+
+    def test_items_no_pagination(self):
+        page = Page(self.query)
+        assert len(page.items) == 7
+        assert page.page_count == 1
+
+    def test_items_process(self):
+        query = self.query.add_columns(self.Model.id * 2)
+        page = Page(query, 2, 3, lambda rows: [value for _, value in rows])
+        assert page.items == [8, 10, 12]
+        assert page.item_count == 7
+
+    def test_iter_batches(self):
+        page = Page(self.query, 1, 5)
+        batches = [[item.id for item in batch]
+                   for batch in page.iter_batches(2)]
+        assert batches == [[1, 2], [3, 4], [5]]
+        assert 'items' not in page.__dict__
+
+    def test_iter_batches_loaded(self):
+        page = Page(self.query, 2, 5)
+        page.items
+        batches = [[item.id for item in batch]
+                   for batch in page.iter_batches(1)]
+        assert batches == [[6], [7]]
+
+    def test_iter_batches_process(self):
+        query = self.query.add_columns(self.Model.id * 2)
+        page = Page(query, 1, None, lambda rows: [value for _, value in rows])
+        assert list(page.iter_batches(4)) == [[2, 4, 6, 8], [10, 12, 14]]
+
+    def test_item_count(self):
+        page = Page(self.query, 1, 3)
+        assert page.item_count == 7
+        assert page.page_count == 3
+
+    def test_item_count_strategy(self):
+        page = Page(self.query, 1, 3, count=lambda query: (100, False))
+        assert page.item_count == 100
+        assert not page.item_count_exact
+        assert page.page_count == 34
+
+    def test_page_count_empty(self):
+        self.session.query(self.Model).delete()
+        page = Page(self.query, 1, 3)
+        assert page.item_count == 0
+        assert page.page_count == 1
+
+    def test_navigation_first(self):
+        page = Page(self.query, 1, 3)
+        assert not page.has_previous
+        assert page.previous_page is None
+        assert page.has_next
+        assert page.next_page == 2
+
+    def test_navigation_last(self):
+        page = Page(self.query, 3, 3)
+        assert page.has_previous
+        assert page.previous_page == 2
+        assert not page.has_next
+        assert page.next_page is None
+
+    @pytest.mark.parametrize("current, expected", [
+        (1, [1, 2, 3, None, 7]),
+        (4, [1, 2, 3, 4, 5, 6, 7]),
+        (7, [1, None, 5, 6, 7]),
+    ])
+    def test_iter_pages(self, current, expected):
+        page = Page(self.query, current, 1)
+        assert list(page.iter_pages()) == expected
+
+
+class TestCount(object):
+
+    @pytest.fixture(autouse=True)
+    def _prepare(self, Model_one_pk, DBSession):
+        self.Model = Model_one_pk
+        self.session = DBSession
+        self.session.add_all([self.Model() for _ in range(7)])
+        self.session.flush()
+        self.query = self.session.query(self.Model).order_by(self.Model.id)
+
+    def test_exact(self):
+        assert ExactCount()(self.query) == (7, True)
+
+    def test_cached(self):
+        count = CachedCount(ttl=60)
+        filtered = self.query.filter(self.Model.id > 5)
+        assert count(self.query) == (7, True)
+        assert count(filtered) == (2, True)
+        self.session.query(self.Model).filter(self.Model.id > 4).delete()
+        assert count(self.query) == (7, True)
+        assert count(filtered) == (2, True)
+        assert count(self.query.filter(self.Model.id > 3)) == (1, True)
+        count.cache.clear()
+        assert count(self.query) == (4, True)
+
+    def test_approximate(self):
+        self.session.execute("ANALYZE")
+        self.session.add(self.Model())
+        self.session.flush()
+        count = ApproximateCount(threshold=5)
+        assert count.estimate(self.query) == 7
+        assert count(self.query) == (7, False)
+
+    def test_approximate_below_threshold(self):
+        self.session.execute("ANALYZE")
+        count = ApproximateCount(threshold=100,
+                                 fallback=lambda query: (1, True))
+        assert count(self.query) == (1, True)
+
+    def test_approximate_filtered(self):
+        self.session.execute("ANALYZE")
+        count = ApproximateCount(threshold=5)
+        assert count(self.query.filter(self.Model.id > 5)) == (2, True)
+
+    @pytest.mark.parametrize('name, schema, expected', [
+        ('model', None, 'model'),
+        ('Model', None, '"Model"'),
+        ('Model', 'app', 'app."Model"'),
+    ])
+    def test_approximate_postgres_table_name(self, name, schema, expected):
+        table = Table(name, MetaData(), schema=schema)
+        count = ApproximateCount()
+        assert count.get_table_name(table, postgresql.dialect()) == expected
+        dialect = sqlite.dialect()
+        assert count.get_table_name(table, dialect) == name
+
+    def test_approximate_no_statistics(self):
+        count = ApproximateCount(threshold=0)
+        assert count.estimate(self.query) is None
+        assert count(self.query) == (7, True)
+
+
+class TestKeysetPage(object):
+
+    @pytest.fixture(autouse=True)
+    def _prepare(self, model_factory, DBSession):
+        self.Model = model_factory([Column('sort', Integer)])
+        self.session = DBSession
+        # Sort values with duplicates to check the primary key tie-break
+        sorts = [3, 1, 2, 1, 3, 2, 1]
+        self.session.add_all([self.Model(sort=sort) for sort in sorts])
+        self.session.flush()
+        self.query = self.session.query(self.Model)
+
+    def keys(self, sort_desc=False, pk_desc=False):
+        return [SortKey(self.Model.sort, sort_desc, attrgetter('sort')),
+                SortKey(self.Model.id, pk_desc, attrgetter('id'))]
+
+    def walk(self, keys, per_page=3):
+        pages = []
+        page = KeysetPage(self.query, keys, per_page)
+        while True:
+            pages.append([item.id for item in page.items])
+            if not page.next_params:
+                return pages, page
+            page = KeysetPage(self.query, keys, per_page,
+                              page.next_params['cursor'])
+
+    def test_first_page(self):
+        page = KeysetPage(self.query, self.keys(), 3)
+        assert [item.id for item in page.items] == [2, 4, 7]
+        assert not page.has_previous
+        assert page.previous_params is None
+        assert page.has_next
+
+    def test_iter_batches(self):
+        page = KeysetPage(self.query, self.keys(), 3)
+        batches = [[item.id for item in batch]
+                   for batch in page.iter_batches(2)]
+        assert batches == [[2, 4], [7]]
+
+    def test_forward(self):
+        pages, last = self.walk(self.keys())
+        assert pages == [[2, 4, 7], [3, 6, 1], [5]]
+        assert last.has_previous
+        assert not last.has_next
+
+    @pytest.mark.parametrize("sort_desc, pk_desc",
+                             [(True, True), (True, False), (False, True)])
+    def test_forward_directions(self, sort_desc, pk_desc):
+        keys = self.keys(sort_desc, pk_desc)
+        expected = self.query.order_by(*[key.clause for key in keys]).all()
+        pages, _ = self.walk(keys, 2)
+        assert sum(pages, []) == [item.id for item in expected]
+
+    def test_backwards(self):
+        _, last = self.walk(self.keys())
+        cursor = last.previous_params['cursor']
+        page = KeysetPage(self.query, self.keys(), 3, cursor)
+        assert [item.id for item in page.items] == [3, 6, 1]
+        assert page.has_previous
+        assert page.has_next
+        cursor = page.previous_params['cursor']
+        page = KeysetPage(self.query, self.keys(), 3, cursor)
+        assert [item.id for item in page.items] == [2, 4, 7]
+        assert not page.has_previous
+        assert page.next_params
+
+    @pytest.mark.parametrize("sort_desc, pk_desc", [
+        (False, False), (True, True), (True, False), (False, True)])
+    def test_nulls(self, sort_desc, pk_desc):
+        self.session.add_all([self.Model() for _ in range(3)])
+        self.session.flush()
+        keys = self.keys(sort_desc, pk_desc)
+        pages, last = self.walk(keys, 2)
+        items = sum(pages, [])
+        # NULL is sorted as the largest value
+        nulls = sorted([8, 9, 10], reverse=pk_desc)
+        if sort_desc:
+            assert items[:3] == nulls
+        else:
+            assert items[-3:] == nulls
+        assert sorted(items) == list(range(1, 11))
+        assert all(pages)
+        previous = []
+        page = last
+        while page.previous_params:
+            page = KeysetPage(self.query, keys, 2,
+                              page.previous_params['cursor'])
+            previous.insert(0, [item.id for item in page.items])
+        assert previous == pages[:-1]
+
+    def test_backwards_process(self):
+        _, last = self.walk(self.keys())
+        cursor = last.previous_params['cursor']
+        page = KeysetPage(self.query, self.keys(), 3, cursor,
+                          lambda rows: [row.id for row in rows])
+        assert page.items == [3, 6, 1]
+
+    def test_no_pagination(self):
+        page = KeysetPage(self.query, self.keys())
+        assert len(page.items) == 7
+        assert not page.has_next
+
+    @pytest.mark.parametrize("cursor", ['garbage', '!!', 'e30', 'W10'])
+    def test_invalid_cursor(self, cursor):
+        page = KeysetPage(self.query, self.keys(), 3, cursor)
+        assert [item.id for item in page.items] == [2, 4, 7]
+        assert not page.has_previous
+
+    @pytest.mark.parametrize("values", [
+        [[1, 2], 1],
+        [{'a': 1}, 1],
+        ['1', 1],
+        [True, 1],
+        [1.5, 1],
+        {'1': 1, '2': 2},
+    ])
+    def test_invalid_cursor_values(self, values):
+        data = json.dumps({'b': False, 'v': values}).encode('utf-8')
+        cursor = base64.urlsafe_b64encode(data).decode('ascii')
+        page = KeysetPage(self.query, self.keys(), 3, cursor)
+        assert page.values is None
+        assert [item.id for item in page.items] == [2, 4, 7]
+
+    def test_iter_pages(self):
+        page = KeysetPage(self.query, self.keys(), 3)
+        assert list(page.iter_pages()) == []
+
+
+class UUID(TypeDecorator):
+    """A UUID stored as a string like ``sqlalchemy_utils.UUIDType``."""
+    impl = CHAR(32)
+    python_type = uuid.UUID
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else uuid.UUID(str(value)).hex
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else uuid.UUID(value)
+
+
+class Color(enum.Enum):
+    red = 1
+    green = 2
+
+
+@pytest.mark.parametrize("type_, value", [
+    (UUID, uuid.UUID('12345678123456781234567812345678')),
+    (Time, time(12, 30, 15, 5)),
+    (Time, time(12, 30)),
+    (Interval, timedelta(days=1, seconds=5)),
+    (Enum(Color), Color.green),
+    (DateTime, datetime(2014, 5, 3, 12, 30, 15, 5)),
+    (DateTime, datetime(2014, 5, 3, 12, 30, 15)),
+    (Date, date(2014, 5, 3)),
+    (Numeric, Decimal('1.50')),
+    (String, 'text'),
+])
+def test_keyset_cursor_values(model_factory, DBSession, type_, value):
+    Model = model_factory([Column('value', type_)])
+    DBSession.add(Model(value=value))
+    DBSession.flush()
+    keys = [SortKey(Model.value, False, attrgetter('value'))]
+    page = KeysetPage(DBSession.query(Model), keys, 1)
+    obj = page.items[0]
+    cursor = page._encode_cursor(obj, False)
+    assert KeysetPage(DBSession.query(Model), keys, 1, cursor).values == [
+        value]
+
+
+@pytest.mark.parametrize("type_, value", [
+    (DateTime, 'foo'),
+    (Date, '2014-13-01'),
+    (Numeric, 'abc'),
+    (Numeric, True),
+    (String, 5),
+    (Boolean, 1),
+    (UUID, 'foo'),
+    (Time, '25:00'),
+    (Interval, 'foo'),
+    (Enum(Color), 'blue'),
+])
+def test_keyset_cursor_invalid_values(model_factory, DBSession, type_,
+                                      value):
+    Model = model_factory([Column('value', type_)])
+    keys = [SortKey(Model.value, False, attrgetter('value'))]
+    data = json.dumps({'b': False, 'v': [value]}).encode('utf-8')
+    cursor = base64.urlsafe_b64encode(data).decode('ascii')
+    page = KeysetPage(DBSession.query(Model), keys, 1, cursor)
+    assert page.values is None
+    assert page.items == []
+
+
+def test_keyset_uuid_pk(model_factory, DBSession):
+    Model = model_factory(defaults=[Column('id', UUID, primary_key=True)])
+    ids = sorted(uuid.uuid4() for _ in range(5))
+    DBSession.add_all([Model(id=id_) for id_ in ids])
+    DBSession.flush()
+    keys = [SortKey(Model.id, False, attrgetter('id'))]
+    query = DBSession.query(Model)
+    page = KeysetPage(query, keys, 2)
+    items = list(page.items)
+    while page.next_params:
+        page = KeysetPage(query, keys, 2, page.next_params['cursor'])
+        items.extend(page.items)
+    assert [item.id for item in items] == ids
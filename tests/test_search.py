@@ -0,0 +1,147 @@
+from pyramid_crud.search import (SearchBackend, LikeSearch, PostgresSearch,
+                                 SQLiteFTSSearch)
+from sqlalchemy import Column, String
+from sqlalchemy.dialects import postgresql
+import pytest
+
+
+class TestSearch(object):
+
+    @pytest.fixture(autouse=True)
+    def _prepare(self, model_factory, DBSession):
+        self.Model = model_factory([Column('title', String),
+                                    Column('body', String)])
+        self.session = DBSession
+
+    def add(self, title, body=None):
+        obj = self.Model()
+        obj.title = title
+        obj.body = body
+        self.session.add(obj)
+        self.session.flush()
+        return obj
+
+    def search(self, backend, term):
+        query = self.session.query(self.Model).order_by(self.Model.id)
+        query = backend.apply(query, self.Model, ('title', 'body'), term)
+        return [obj.id for obj in query]
+
+    def test_base(self):
+        backend = SearchBackend()
+        assert backend.setup(self.Model, ('title',)) is None
+        with pytest.raises(NotImplementedError):
+            self.search(backend, 'foo')
+
+    def test_like(self):
+        self.add('Hello World')
+        self.add('Goodbye', 'Cruel world')
+        self.add('Hello', 'there')
+        backend = LikeSearch()
+        assert self.search(backend, 'world') == [1, 2]
+        assert self.search(backend, 'hello WORLD') == [1]
+        assert self.search(backend, 'hello there') == [3]
+        assert self.search(backend, 'missing') == []
+
+    def test_like_escape(self):
+        self.add('100% sure')
+        self.add('1000 sure')
+        self.add('under_score')
+        self.add('underscore')
+        backend = LikeSearch()
+        assert self.search(backend, '100%') == [1]
+        assert self.search(backend, 'r_s') == [3]
+
+    @pytest.mark.parametrize('vector, expected', [
+        (None, "to_tsvector(%(to_tsvector_1)s, concat_ws(%(concat_ws_1)s, "
+               "model.title, model.body)) @@ "
+               "plainto_tsquery(%(plainto_tsquery_1)s, "
+               "%(plainto_tsquery_2)s)"),
+        ('title', "model.title @@ plainto_tsquery(%(plainto_tsquery_1)s, "
+                  "%(plainto_tsquery_2)s)"),
+    ])
+    def test_postgres(self, vector, expected):
+        backend = PostgresSearch('english', vector)
+        query = self.session.query(self.Model)
+        query = backend.apply(query, self.Model, ('title', 'body'), 'foo')
+        sql = str(query.statement.compile(dialect=postgresql.dialect()))
+        assert sql.endswith("WHERE " + expected)
+
+
+class TestSQLiteFTSSearch(object):
+
+    @pytest.fixture(autouse=True)
+    def _prepare(self, model_factory, DBSession):
+        self.Model = model_factory([Column('title', String),
+                                    Column('body', String)])
+        self.session = DBSession
+        self.backend = SQLiteFTSSearch()
+        self.backend.setup(self.Model, ('title', 'body'))
+        self.backend.create(self.session.connection(), self.Model)
+
+    def add(self, title, body=None):
+        obj = self.Model()
+        obj.title = title
+        obj.body = body
+        self.session.add(obj)
+        self.session.flush()
+        return obj
+
+    def search(self, term):
+        query = self.session.query(self.Model).order_by(self.Model.id)
+        query = self.backend.apply(query, self.Model, ('title', 'body'),
+                                   term)
+        return [obj.id for obj in query]
+
+    def test_table_name(self):
+        assert self.backend.get_table_name(self.Model) == 'model_fts'
+
+    def test_search(self):
+        self.add('Hello World')
+        self.add('Goodbye', 'Cruel world')
+        self.add('Hello', 'there')
+        assert self.search('world') == [1, 2]
+        assert self.search('hello world') == [1]
+        assert self.search('hel') == [1, 3]
+        assert self.search('missing') == []
+
+    def test_search_syntax(self):
+        self.add('Say "hello" OR NOT')
+        assert self.search('"hello" OR') == [1]
+        assert self.search('NOT AND (') == []
+
+    def test_update_delete(self):
+        obj = self.add('Hello')
+        obj.title = 'World'
+        self.session.flush()
+        assert self.search('hello') == []
+        assert self.search('world') == [1]
+        self.session.delete(obj)
+        self.session.flush()
+        assert self.search('world') == []
+
+    def test_rebuild(self):
+        self.add('Hello')
+        self.session.query(self.Model).update({'title': 'World'})
+        assert self.search('world') == []
+        self.backend.rebuild(self.session.connection(), self.Model)
+        assert self.search('world') == [1]
+
+    def test_setup_twice(self):
+        self.backend.setup(self.Model, ('title', 'body'))
+        with pytest.raises(ValueError):
+            self.backend.setup(self.Model, ('title',))
+
+    def test_setup_invalid_pk(self, model_factory):
+        Model = model_factory(name='Other',
+                              defaults=[Column('id', String,
+                                               primary_key=True)])
+        with pytest.raises(ValueError):
+            self.backend.setup(Model, ('id',))
+
+    def test_create_with_table(self, model_factory, metadata, engine):
+        Model = model_factory([Column('title', String)], name='Other')
+        self.backend.setup(Model, ('title',))
+        metadata.drop_all(engine)
+        metadata.create_all(engine)
+        names = engine.table_names()
+        assert 'other_fts' in names
@@ -1,7 +1,7 @@
 import pytest
 from pyramid.renderers import render as pyramid_render
 from pyramid_crud import forms, views
-from sqlalchemy import Column, String, Boolean, ForeignKey
+from sqlalchemy import Column, String, Boolean, ForeignKey, event, func
 from sqlalchemy.orm import relationship
 from webob.multidict import MultiDict
 from pyramid.interfaces import IRendererFactory
@@ -57,6 +57,7 @@ def view(pyramid_request, model_factory, form_factory, venusian_init, config,
         Form = _Form
         url_path = '/test'
         list_display = ('id', 'test_text', 'test_bool')
+        list_export = ('csv', 'ndjson')
     venusian_init(MyView)
     view = MyView(pyramid_request)
     config.commit()
@@ -115,8 +116,8 @@ def test_list(render_list, view):
     bool_head = heads[3]
     assert 'column-test_text' in text_head.attrs['class']
     assert 'column-test_bool' in bool_head.attrs['class']
-    assert 'Test Text' in text_head.string.strip()
-    assert 'Test Bool' in bool_head.string.strip()
+    assert 'Test Text' in text_head.get_text()
+    assert 'Test Bool' in bool_head.get_text()
     assert "<h1>Models</h1>" == str(out.find("h1"))
     assert "Models | CRUD" == out.find("title").string.strip()
     bool_item = out.find_all('td')[3]
@@ -145,6 +146,247 @@ def test_list_bool_false_link(render_list, view):
     assert bool_a.string.strip() == 'No'
 
 
+def test_list_pagination(render_list, view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i) for i in range(5)])
+    view.__class__.list_per_page = 2
+    view.request.GET['page'] = '2'
+    out = render_list(view=view, **view.list())
+    assert "Item 2" in str(out)
+    assert "Item 0" not in str(out)
+    pagination = out.find("ul", class_="pagination")
+    assert pagination.find("li", class_="active").string.strip() == "2"
+    links = [a.attrs['href'] for a in pagination.find_all("a")]
+    assert 'http://example.com/test?page=1' in links
+    assert 'http://example.com/test?page=3' in links
+
+
+@pytest.mark.parametrize('exact, expected', [
+    (True, '5 items'),
+    (False, 'about 5 items'),
+])
+def test_list_pagination_count(render_list, view, exact, expected):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i) for i in range(5)])
+    view.__class__.list_per_page = 2
+    view.__class__.list_count = lambda self, query: (query.count(), exact)
+    out = render_list(view=view, **view.list())
+    count = out.find("p", class_="list-count")
+    assert " ".join(count.get_text().split()) == expected
+
+
+def test_list_pagination_keyset(render_list, view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i) for i in range(5)])
+    view.__class__.list_per_page = 2
+    view.__class__.list_pagination = 'keyset'
+    out = render_list(view=view, **view.list())
+    pagination = out.find("ul", class_="pagination")
+    assert pagination.find("li", class_="active") is None
+    assert out.find("p", class_="list-count") is None
+    [link] = pagination.find_all("a")
+    assert link.string == u'\xbb'
+    assert 'cursor=' in link.attrs['href']
+
+
+def test_list_sort_links(render_list, view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i) for i in range(3)])
+    view.request.GET['order'] = '-test_text'
+    view.request.GET['page'] = '1'
+    out = render_list(view=view, **view.list())
+    _, id_head, text_head, bool_head = out.find_all("th")
+    assert id_head.find("a").attrs['href'] == \
+        'http://example.com/test?order=id'
+    assert id_head.find("span") is None
+    assert text_head.find("a").attrs['href'] == \
+        'http://example.com/test?order=test_text'
+    assert 'glyphicon-sort-by-attributes-alt' in \
+        text_head.find("span").attrs['class']
+    cells = [row.find_all("td")[2].get_text().strip()
+             for row in out.find("tbody").find_all("tr")]
+    assert cells == ['Item 2', 'Item 1', 'Item 0']
+
+
+def test_list_filter(render_list, view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i, test_bool=i == 1)
+                            for i in range(3)])
+    view.__class__.list_filter = ('test_bool',)
+    view.request.GET['test_bool'] = '1'
+    view.request.GET['order'] = '-id'
+    out = render_list(view=view, **view.list())
+    form = out.find("form", class_="list-filter")
+    assert form.find("label").string.strip() == "Test Bool"
+    select = form.find("select", attrs={'name': 'test_bool'})
+    assert select.find("option", selected=True).string == "Yes"
+    order = form.find("input", attrs={'name': 'order'})
+    assert order.attrs['value'] == '-id'
+    assert "Item 1" in str(out)
+    assert "Item 0" not in str(out)
+
+
+def test_list_filter_facets(render_list, view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i, test_bool=i == 1)
+                            for i in range(3)])
+    view.__class__.list_filter = ('test_bool',)
+    view.__class__.list_facets = True
+    out = render_list(view=view, **view.list())
+    select = out.find("select", attrs={'name': 'test_bool'})
+    options = [option.string for option in select.find_all("option")]
+    assert options == ['All', 'Yes (1)', 'No (2)']
+
+
+def test_list_search(render_list, view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i) for i in range(3)])
+    view.__class__.search_fields = ('test_text',)
+    view.request.GET['q'] = 'item 1'
+    out = render_list(view=view, **view.list())
+    form = out.find("form", class_="list-filter")
+    assert form.find("input", attrs={'name': 'q'}).attrs['value'] == 'item 1'
+    assert form.find("select") is None
+    assert "Item 1" in str(out)
+    assert "Item 0" not in str(out)
+
+
+def test_list_no_filter(render_list, view):
+    out = render_list(view=view, **view.list())
+    assert out.find("form", class_="list-filter") is None
+
+
+def test_list_export_links(render_list, view):
+    view.request.GET['test_text'] = 'foo'
+    view.request.GET['page'] = '2'
+    out = render_list(view=view, **view.list())
+    links = dict((a.string, a.attrs['href'])
+                 for a in out.find_all("a", class_="list-export"))
+    assert links == {
+        'CSV': 'http://example.com/test/export.csv?test_text=foo',
+        'NDJSON': 'http://example.com/test/export.ndjson?test_text=foo',
+    }
+
+
+def test_list_no_export(render_list, view):
+    view.__class__.list_export = ()
+    out = render_list(view=view, **view.list())
+    assert out.find("a", class_="list-export") is None
+
+
+def _normalize(html):
+    return " ".join(str(html).split()).replace("> <", "><")
+
+
+def test_list_stream(render_list, view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i,
+                                  test_bool=bool(i % 2))
+                            for i in range(5)])
+    view.dbsession.flush()
+    expected = render_list(view=view, **view.list())
+    View = view.__class__
+    View.list_stream = True
+    View.list_stream_batch_size = 2
+    response = View(view.request).list()
+    assert response.content_type == 'text/html'
+    assert response.charset == 'utf-8'
+    chunks = list(response.app_iter)
+    # Everything before the rows, three batches of rows and the rest
+    assert len(chunks) == 5
+    out = BeautifulSoup(b''.join(chunks).decode('utf-8'))
+    assert _normalize(out) == _normalize(expected)
+    ids = [box.attrs['id'] for box in out.find_all("input", type="checkbox")]
+    assert ids == ['items-%d' % i for i in range(5)]
+
+
+def test_list_readonly(render_list, view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i,
+                                  test_bool=bool(i % 2))
+                            for i in range(3)])
+    view.dbsession.flush()
+    expected = render_list(view=view, **view.list())
+    View = view.__class__
+    View.list_readonly = True
+    view = View(view.request)
+    out = render_list(view=view, **view.list())
+    assert _normalize(out) == _normalize(expected)
+
+
+def test_list_stream_batch_columns(view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i) for i in range(5)])
+    calls = []
+
+    def batch(items):
+        calls.append([item.id for item in items])
+        return dict((item.id, 'batch %d' % item.id) for item in items)
+    batch.info = {'batch': True, 'label': 'Batch'}
+
+    def length(obj):
+        pass
+    length.info = {'expression': func.length(Model.test_text),
+                   'label': 'Length'}
+    View = view.__class__
+    View.list_display = ('id', batch, length)
+    View.list_stream = True
+    View.list_stream_batch_size = 2
+    view = View(view.request)
+    out = BeautifulSoup(b''.join(view.list().app_iter).decode('utf-8'))
+    rows = [[td.get_text().strip() for td in row.find_all("td")[1:]]
+            for row in out.find("tbody").find_all("tr")]
+    assert rows[4] == ['5', 'batch 5', '6']
+    assert calls == [[1, 2], [3, 4], [5]]
+    assert view._list_expression_values == {'length': {}}
+
+
+def test_list_stream_pagination(view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i) for i in range(5)])
+    View = view.__class__
+    View.list_stream = True
+    View.list_per_page = 2
+    view.request.GET['page'] = '2'
+    response = View(view.request).list()
+    out = BeautifulSoup(b''.join(response.app_iter).decode('utf-8'))
+    rows = out.find("tbody").find_all("tr")
+    assert [row.find_all("td")[2].get_text().strip() for row in rows] == \
+        ['Item 2', 'Item 3']
+    pagination = out.find("ul", class_="pagination")
+    assert pagination.find("li", class_="active").string.strip() == "2"
+
+
+def test_list_stream_rows_from_cursor(view):
+    Model = view.Form.Meta.model
+    view.dbsession.add_all([Model(test_text='Item %d' % i) for i in range(5)])
+    view.dbsession.flush()
+    View = view.__class__
+    View.list_stream = True
+    View.list_per_page = None
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    engine = view.dbsession.get_bind()
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        body = iter(View(view.request).list().app_iter)
+        assert b'<table' in next(body)
+        assert statements == []
+        assert b'Item 0' in next(body)
+        assert len(statements) == 1
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+
+def test_list_no_pagination(render_list, view):
+    obj = view.Form.Meta.model(test_text='Testval')
+    view.dbsession.add(obj)
+    out = render_list(view=view, **view.list())
+    assert out.find("ul", class_="pagination") is None
+
+
 # TODO: Implement a test for when no items exist yet (and add that
 # functionality)
 def test_list_empty():
@@ -1,7 +1,14 @@
 from pyramid_crud import util
-from sqlalchemy import Column, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, ForeignKey, Integer, String, event
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import backref, relationship
+import pytest
 import six
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
 
 
 class Test_get_pks(object):
@@ -25,6 +32,109 @@ class Test_get_pks(object):
         assert sorted(util.get_pks(Child)) == ['id']
 
 
+class Test_get_pk_info(object):
+
+    def test_single_pk(self, Model_one_pk):
+        info = util.get_pk_info(Model_one_pk)
+        assert info.names == ('id',)
+        assert info.columns == (inspect(Model_one_pk).local_table.c.id,)
+        [convert] = info.converters
+        assert convert('5') == 5
+
+    def test_different_colname(self, Model_diff_colname):
+        info = util.get_pk_info(Model_diff_colname)
+        assert info.names == ('id',)
+        assert info.columns[0].name == 'id2'
+
+    def test_string_pk(self, model_factory):
+        Model = model_factory(defaults=[Column('name', String,
+                                               primary_key=True)])
+        [convert] = util.get_pk_info(Model).converters
+        assert convert('foo') == 'foo'
+
+    def test_invalid_value(self, Model_one_pk):
+        [convert] = util.get_pk_info(Model_one_pk).converters
+        with pytest.raises(ValueError):
+            convert('foo')
+
+    def test_cached(self, Model_one_pk):
+        info = util.get_pk_info(Model_one_pk)
+        assert util.get_pk_info(Model_one_pk) is info
+        assert util._pk_info_cache[inspect(Model_one_pk)] is info
+
+    def test_get_pks_copy(self, Model_one_pk):
+        pks = util.get_pks(Model_one_pk)
+        pks.append('foo')
+        assert util.get_pks(Model_one_pk) == ['id']
+
+    def test_invalidated_on_configure(self, Model_one_pk):
+        info = util.get_pk_info(Model_one_pk)
+        mapper = inspect(Model_one_pk)
+        mapper.dispatch.mapper_configured(mapper, Model_one_pk)
+        new_info = util.get_pk_info(Model_one_pk)
+        assert new_info is not info
+        assert new_info == info
+
+
+class Test_can_bulk_delete(object):
+
+    @pytest.fixture(autouse=True)
+    def _prepare(self, model_factory):
+        self.model_factory = model_factory
+        self.Parent = model_factory(name='Parent')
+
+    def child(self, **kw):
+        cols = [Column('parent_id', ForeignKey('parent.id'))]
+        rels = {'parent': relationship(self.Parent, **kw)}
+        return self.model_factory(cols, 'Child', relationships=rels)
+
+    def test_plain(self, Model_one_pk):
+        assert util.can_bulk_delete(Model_one_pk)
+
+    def test_many_to_one(self):
+        Child = self.child()
+        assert util.can_bulk_delete(Child)
+        assert util.can_bulk_delete(self.Parent)
+
+    def test_many_to_one_cascade(self):
+        Child = self.child(cascade='all, delete')
+        assert not util.can_bulk_delete(Child)
+
+    def test_collection(self):
+        self.child(backref='children')
+        assert not util.can_bulk_delete(self.Parent)
+
+    def test_collection_passive_deletes(self):
+        self.child(backref=backref('children', passive_deletes=True))
+        assert util.can_bulk_delete(self.Parent)
+
+    def test_viewonly(self):
+        self.child(backref=backref('children', viewonly=True))
+        assert util.can_bulk_delete(self.Parent)
+
+    def test_listener(self, Model_one_pk):
+        listener = lambda mapper, connection, target: None  # noqa: E731
+        event.listen(Model_one_pk, 'after_delete', listener)
+        try:
+            assert not util.can_bulk_delete(Model_one_pk)
+        finally:
+            event.remove(Model_one_pk, 'after_delete', listener)
+        assert util.can_bulk_delete(Model_one_pk)
+
+    def test_inheritance(self):
+        Base = declarative_base()
+
+        class Parent(Base):
+            __tablename__ = 'parent'
+            id = Column(Integer, primary_key=True)
+
+        class Child(Parent):
+            __tablename__ = 'child'
+            id = Column(ForeignKey('parent.id'), primary_key=True)
+        assert not util.can_bulk_delete(Child)
+        assert not util.can_bulk_delete(Parent)
+
+
 def test_meta_property():
     class Meta(type):
         @util.meta_property
@@ -80,3 +190,113 @@ def test_meta_property_new_meta():
 
     assert Test.test == "Test"
     assert TestWithMeta.test == "Test"
+
+
+class TestImmutableDict(object):
+
+    def test_read(self):
+        d = util.ImmutableDict({'a': 1})
+        assert d['a'] == 1
+        assert dict(d) == {'a': 1}
+
+    @pytest.mark.parametrize('change', [
+        lambda d: d.__setitem__('a', 2),
+        lambda d: d.__delitem__('a'),
+        lambda d: d.update(a=2),
+        lambda d: d.setdefault('b', 2),
+        lambda d: d.pop('a'),
+        lambda d: d.popitem(),
+        lambda d: d.clear(),
+    ])
+    def test_immutable(self, change):
+        d = util.ImmutableDict({'a': 1})
+        with pytest.raises(TypeError):
+            change(d)
+        assert d == {'a': 1}
+
+
+class TestIterBatches(object):
+
+    @pytest.fixture(autouse=True)
+    def _prepare(self, Model_one_pk, DBSession):
+        self.Model = Model_one_pk
+        self.session = DBSession
+        self.session.add_all([self.Model() for _ in range(5)])
+        self.session.flush()
+        self.session.expunge_all()
+        self.query = self.session.query(self.Model).order_by(self.Model.id)
+
+    def test_batches(self):
+        batches = []
+        for batch in util.iter_batches(self.query, 2):
+            batches.append([item.id for item in batch])
+            assert len(self.session.identity_map) == len(batch)
+        assert batches == [[1, 2], [3, 4], [5]]
+        assert len(self.session.identity_map) == 0
+
+    def test_no_expunge(self):
+        batches = list(util.iter_batches(self.query, 2, expunge=False))
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert len(self.session.identity_map) == 5
+
+    def test_tuples(self):
+        query = self.query.add_columns(self.Model.id * 2)
+        batches = list(util.iter_batches(query, 3))
+        assert [[value for _, value in batch] for batch in batches] == \
+            [[2, 4, 6], [8, 10]]
+        assert len(self.session.identity_map) == 0
+
+    def test_close(self):
+        batches = util.iter_batches(self.query, 2)
+        next(batches)
+        batches.close()
+        assert len(self.session.identity_map) == 0
+
+    def test_keeps_modified(self):
+        for batch in util.iter_batches(self.query, 2):
+            batch[0].id = batch[0].id * 10
+        assert len(self.session.identity_map) == 3
+        self.session.flush()
+        ids = [id_ for id_, in self.session.query(self.Model.id)]
+        assert sorted(ids) == [2, 4, 10, 30, 50]
+
+
+def test_split():
+    assert list(util.split([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+    assert list(util.split((), 2)) == []
+
+
+class TestTTLCache(object):
+
+    @pytest.fixture
+    def now(self):
+        with patch('time.time') as time:
+            time.return_value = 100
+            yield time
+
+    def test_get_set(self, now):
+        cache = util.TTLCache()
+        assert cache.get('a') is None
+        assert cache.get('a', 1) == 1
+        cache.set('a', 2, 10)
+        assert cache.get('a') == 2
+
+    def test_expire(self, now):
+        cache = util.TTLCache()
+        cache.set('a', 2, 10)
+        now.return_value = 110
+        assert cache.get('a') is None
+
+    def test_maxsize(self, now):
+        cache = util.TTLCache(2)
+        for key in 'abc':
+            cache.set(key, key, 10)
+        assert cache.get('a') is None
+        assert cache.get('b') == 'b'
+        assert cache.get('c') == 'c'
+
+    def test_clear(self, now):
+        cache = util.TTLCache()
+        cache.set('a', 2, 10)
+        cache.clear()
+        assert cache.get('a') is None
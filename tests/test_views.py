@@ -1,15 +1,25 @@
-from pyramid.httpexceptions import HTTPFound
+from pyramid.httpexceptions import HTTPFound, HTTPNotFound
 from pyramid.response import Response
-from pyramid_crud.views import CRUDView, ViewConfigurator
+from pyramid_crud.views import (CRUDView, ViewConfigurator, ListColumn,
+                                RelationshipCount)
+from pyramid_crud.pagination import Page, ExactCount, CachedCount
+from pyramid_crud.filters import BooleanFilter, ChoiceFilter
+from pyramid_crud.search import LikeSearch
 from pyramid_crud import forms
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean
+from sqlalchemy import (Column, String, Integer, ForeignKey, Boolean,
+                        event, func)
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
+from sqlalchemy.inspection import inspect
 from webob.multidict import MultiDict
 import pytest
+import gzip
+import io
+import zlib
 try:
-    from unittest.mock import MagicMock, patch
+    from unittest.mock import MagicMock, PropertyMock, patch
 except ImportError:
-    from mock import MagicMock, patch
+    from mock import MagicMock, PropertyMock, patch
 try:
     from collections import OrderedDict
 except ImportError:  # pragma: no cover
@@ -24,6 +34,7 @@ def route_setup(config):
     config.add_route(basename + "list", '/test')
     config.add_route(basename + "edit", '/test/{id}/edit')
     config.add_route(basename + "new", '/test/new')
+    config.add_route(basename + "export", '/test/export.{format}')
     config.commit()
 
 
@@ -50,6 +61,7 @@ class TestCRUDView(object):
         view_attrs = {
             'Form': self.Form,
             'url_path': '/test',
+            'list_export': ('csv', 'ndjson'),
         }
         if request_dbsession:
             self.request.dbsession = DBSession
@@ -61,6 +73,7 @@ class TestCRUDView(object):
             'list': 'tests.test_views.MyView.list',
             'edit': 'tests.test_views.MyView.edit',
             'new': 'tests.test_views.MyView.new',
+            'export': 'tests.test_views.MyView.export',
         }
         self.view = self.View(self.request)
 
@@ -82,6 +95,34 @@ class TestCRUDView(object):
         ChildForm = form_factory(model=ChildModel, base=forms.CSRFModelForm)
         return ChildForm
 
+    @pytest.fixture
+    def ChildView(self, ChildForm):
+        ChildView = type('ChildView', (CRUDView,), {
+            'Form': ChildForm,
+            'url_path': '/child',
+            'dbsession': self.session,
+        })
+        ChildView.routes = {
+            'list': 'tests.test_views.ChildView.list',
+            'edit': 'tests.test_views.ChildView.edit',
+            'new': 'tests.test_views.ChildView.new',
+            'export': 'tests.test_views.ChildView.export',
+        }
+        return ChildView
+
+    def count_statements(self, func):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        engine = self.session.get_bind()
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            func()
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        return len(statements)
+
     @pytest.fixture(params=['str', 'callable'])
     def make_action(self, request):
         def create_action(with_info=True):
@@ -253,6 +294,211 @@ class TestCRUDView(object):
         cols = list(self.view.iter_list_cols(obj))
         assert cols == [('upper', self.View.upper)]
 
+    def test_compile_list_display(self):
+        def func(obj):
+            pass
+
+        def view_meth(self, obj):
+            pass
+        self.View.view_meth = view_meth
+        compiled = self.View._compile_list_display(
+            ('id', '__str__', 'view_meth', func))
+        assert [(col.name, col.kind) for col in compiled.columns] == [
+            ('id', ListColumn.MODEL_ATTRIBUTE),
+            ('__str__', ListColumn.MODEL_METHOD),
+            ('view_meth', ListColumn.VIEW),
+            ('func', ListColumn.CALLABLE),
+        ]
+
+    def test_compile_list_display_cached(self):
+        cols = self.View._compile_list_display(['id', 'test_text'])
+        assert self.View._compile_list_display(('id', 'test_text')) is cols
+        assert self.View._compile_list_display(('id',)) is not cols
+        assert self.View._compile_list_display(
+            ('id', 'test_text'), ['test_text']) is not cols
+
+    def test_compile_list_display_head(self):
+        compiled = self.View._compile_list_display(('id', 'test_text'))
+        assert compiled.head == tuple(col.info for col in compiled.columns)
+        assert compiled.head[0]['label'] == 'ID'
+        with pytest.raises(TypeError):
+            compiled.head[0]['label'] = 'Changed'
+
+    def test_list_links_default(self):
+        self.View.list_display = ('id', 'test_text')
+        assert self.view._list_links == frozenset([0])
+
+    def test_list_links_empty(self):
+        self.View.list_display = ()
+        assert self.view._list_links == frozenset()
+
+    def test_list_links_custom(self):
+        self.View.list_display = ('id', 'test_text', 'test_bool')
+        self.View.list_display_links = ('test_bool', 'test_text')
+        assert self.view._list_links == frozenset([1, 2])
+
+    def test_iter_list_cols_resolved_once(self, obj):
+        self.View.list_display = ('id', 'test_text')
+        with patch.object(self.View, '_compile_list_display',
+                          wraps=self.View._compile_list_display) as mock:
+            for _ in range(3):
+                list(self.view.iter_list_cols(obj))
+        assert mock.call_count == 1
+
+    def test_iter_list_cols_batch(self):
+        calls = []
+
+        def batch(items):
+            calls.append(items)
+            return dict((item.id, item.id * 10) for item in items[1:])
+        batch.info = {'batch': True}
+        self.View.list_display = ('id', batch)
+        self.session.add_all([self.Model() for _ in range(3)])
+        self.session.flush()
+        items = self.view.list()['items']
+        rows = [list(self.view.iter_list_cols(item)) for item in items]
+        assert rows == [
+            [('id', 1), ('batch', None)],
+            [('id', 2), ('batch', 20)],
+            [('id', 3), ('batch', 30)],
+        ]
+        assert calls == [items]
+
+    def test_iter_list_cols_batch_view_method(self, obj):
+        def view_batch(self, items):
+            return dict((item.id, 'view') for item in items)
+        view_batch.info = {'batch': True}
+        self.View.view_batch = view_batch
+        self.View.list_display = ('view_batch',)
+        [item] = self.view.list()['items']
+        assert list(self.view.iter_list_cols(item)) == [
+            ('view_batch', 'view')]
+
+    def test_compile_list_display_batch_only_callables(self):
+        self.Model.test_text.info['batch'] = True
+        compiled = self.View._compile_list_display(('test_text',))
+        assert not compiled.columns[0].batch
+
+    def test_list_display_expression(self):
+        def text_length(obj):
+            raise AssertionError("Must not be called")
+        text_length.info = {'expression': func.length(self.Model.test_text)}
+        self.View.list_display = ('id', text_length)
+        for text in ['a', 'abc']:
+            self.session.add(self.Model(test_text=text))
+        self.session.flush()
+
+        rows = []
+
+        def render():
+            for item in self.view.list()['items']:
+                rows.append(list(self.view.iter_list_cols(item)))
+        assert self.count_statements(render) == 1
+        assert rows == [[('id', 1), ('text_length', 1)],
+                        [('id', 2), ('text_length', 3)]]
+        assert self.view._get_list_load_columns() == ['id']
+
+    def test_list_display_expression_keyset(self):
+        def text_length(obj):
+            pass
+        text_length.info = {'expression': func.length(self.Model.test_text)}
+        self.View.list_display = ('id', text_length)
+        self.View.list_pagination = 'keyset'
+        self.View.list_per_page = 1
+        for text in ['a', 'abc']:
+            self.session.add(self.Model(test_text=text))
+        self.session.flush()
+        page = self.view.list()['page']
+        self.request.GET['cursor'] = page.next_params['cursor']
+        view = self.View(self.request)
+        [item] = view.list()['items']
+        assert list(view.iter_list_cols(item)) == [
+            ('id', 2), ('text_length', 3)]
+
+    def test_list_order_keyset_nulls(self):
+        self.View.list_display = ('id', 'test_text')
+        self.View.list_pagination = 'keyset'
+        self.View.list_per_page = 2
+        for text in ['b', None, 'a', None, 'c', None]:
+            self.session.add(self.Model(test_text=text))
+        self.session.flush()
+        self.request.GET['order'] = 'test_text'
+        ids = []
+        while True:
+            page = self.View(self.request).list()['page']
+            ids.extend(item.id for item in page.items)
+            if not page.next_params:
+                break
+            self.request.GET['cursor'] = page.next_params['cursor']
+        assert ids == [3, 1, 5, 2, 4, 6]
+
+    def test_list_display_hybrid(self):
+        self.Model.upper_text = hybrid_property(
+            lambda self: self.test_text.upper(),
+            expr=lambda cls: func.upper(cls.test_text))
+        self.View.list_display = ('upper_text',)
+        self.session.add(self.Model(test_text='abc'))
+        self.session.flush()
+        [col] = self.View._compile_list_display(('upper_text',)).columns
+        assert col.kind == ListColumn.EXPRESSION
+        [item] = self.view.list()['items']
+        assert list(self.view.iter_list_cols(item)) == [
+            ('upper_text', 'ABC')]
+
+    @pytest.mark.parametrize('hybrid', [
+        lambda self: (self.test_text or '').upper(),
+        lambda self: self.test_text is not None and self.test_text.upper(),
+    ])
+    def test_list_display_hybrid_python(self, hybrid):
+        self.Model.upper_text = hybrid_property(hybrid)
+        self.View.list_display = ('upper_text',)
+        self.session.add(self.Model(test_text='abc'))
+        self.session.flush()
+        [col] = self.View._compile_list_display(('upper_text',)).columns
+        assert col.kind == ListColumn.MODEL_ATTRIBUTE
+        assert col.info['label'] == 'Upper Text'
+        [item] = self.view.list()['items']
+        assert list(self.view.iter_list_cols(item)) == [
+            ('upper_text', 'ABC')]
+
+    def test_list_display_hybrid_info_expression(self):
+        upper_text = hybrid_property(lambda self: self.test_text.upper())
+        upper_text.info['expression'] = func.upper(self.Model.test_text)
+        self.Model.upper_text = upper_text
+        [col] = self.View._compile_list_display(('upper_text',)).columns
+        assert col.kind == ListColumn.EXPRESSION
+
+    def test_list_display_relationship_count(self, ChildForm):
+        self.View.list_display = ('id', RelationshipCount('children'))
+        Child = ChildForm.Meta.model
+        for count in [2, 0, 1]:
+            parent = self.Model()
+            parent.children.extend([Child() for _ in range(count)])
+            self.session.add(parent)
+        self.session.flush()
+        self.session.expunge_all()
+        [head] = list(self.view.iter_head_cols())[1:]
+        assert head['label'] == 'Children Count'
+        rows = []
+
+        def render():
+            for item in self.view.list()['items']:
+                rows.append(list(self.view.iter_list_cols(item)))
+                assert 'children' in inspect(item).unloaded
+        assert self.count_statements(render) == 1
+        assert [row[1] for row in rows] == [
+            ('children_count', 2), ('children_count', 0),
+            ('children_count', 1)]
+
+    def test_relationship_count_options(self):
+        count = RelationshipCount('children', 'Kids', 'kids')
+        assert count.name == 'kids'
+        assert count.info == {'label': 'Kids'}
+
+    def test_relationship_count_no_relationship(self):
+        with pytest.raises(AttributeError):
+            RelationshipCount('test_text').get_expression(self.Model)
+
     def test_default_theme(self):
         assert isinstance(self.view.theme, str)
 
@@ -271,7 +517,8 @@ class TestCRUDView(object):
 
     def test_get_action_form_obj(self, obj):
         Form = self.view.get_action_form()
-        form = Form(self.request.POST, csrf_context=self.request)
+        form = Form(self.request.POST, csrf_context=self.request,
+                    item_choices=self.view._get_item_choices())
         assert len(form.action.choices) == 2
         assert len(form.items.choices) == 1
         assert form.items.choices[0][0] == str(obj.id)
@@ -287,6 +534,33 @@ class TestCRUDView(object):
         assert form is self.view.get_action_form()
         assert self.view._action_form is form
 
+    def test_get_action_form_cached_per_class(self):
+        form = self.view.get_action_form()
+        assert form is self.View(self.request).get_action_form()
+
+    def test_get_action_form_cached_per_actions(self, make_action):
+        form = self.view.get_action_form()
+        make_action()
+        other_form = self.View(self.request).get_action_form()
+        assert other_form is not form
+        other_form = other_form(csrf_context=self.request)
+        assert len(other_form.action.choices) == 3
+
+    def test_get_action_form_cached_subclass(self):
+        form = self.view.get_action_form()
+        SubView = type('MyView', (self.View,),
+                       {'Form': self.Form, 'url_path': '/test'})
+        assert SubView(self.request).get_action_form() is not form
+
+    def test_get_action_form_item_choices(self):
+        Form = self.view.get_action_form()
+        lookup = MagicMock()
+        form = Form(self.request.POST, csrf_context=self.request,
+                    item_choices=[('1', '')], lookup=lookup)
+        assert form.items.choices == [('1', '')]
+        assert form.items.lookup is lookup
+        assert Form(csrf_context=self.request).items.choices == []
+
     @pytest.mark.usefixtures("route_setup")
     def test_redirect(self):
         redirect = self.view.redirect("tests.test_views.MyView.list")
@@ -331,7 +605,7 @@ class TestCRUDView(object):
 
     def test_list_empty(self):
         data = self.view.list()
-        assert len(data) == 2
+        assert len(data) == 3
         query = data['items']
         assert list(query) == []
         action_form = data['action_form']
@@ -339,7 +613,7 @@ class TestCRUDView(object):
 
     def test_list_obj(self, obj):
         data = self.view.list()
-        assert len(data) == 2
+        assert len(data) == 3
         query = data['items']
         items = list(query)
         assert len(items) == 1
@@ -349,6 +623,657 @@ class TestCRUDView(object):
         action_form = data['action_form']
         assert len(action_form.items.choices) == 1
 
+    def test_list_single_query(self, obj):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        engine = self.session.get_bind()
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            data = self.view.list()
+            rows = list(zip(data['items'], data['action_form'].items))
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        assert len(rows) == 1
+        assert len(statements) == 1
+
+    def test_list_load_columns_default(self):
+        assert self.View.list_load_columns is None
+        assert self.view._get_list_load_columns() is None
+
+    def test_list_load_columns_auto(self):
+        self.View.list_display = ('test_text', 'id')
+        assert self.view._get_list_load_columns() == ['id', 'test_text']
+
+    def test_list_load_columns_callable(self):
+        self.View.list_display = ('test_text', lambda obj: obj.test_bool)
+        assert self.view._get_list_load_columns() is None
+
+    def test_list_load_columns_override(self):
+        self.View.list_display = ('test_text', lambda obj: obj.test_bool)
+        self.View.list_load_columns = ('test_bool',)
+        assert self.view._get_list_load_columns() == [
+            'id', 'test_text', 'test_bool']
+
+    def test_list_defers_columns(self, obj):
+        self.session.expunge_all()
+        self.View.list_display = ('test_text',)
+        [item] = self.view.list()['items']
+        assert inspect(item).unloaded == set(['test_bool'])
+        assert item.test_bool is True
+
+    def test_list_display_path(self, ChildView):
+        ChildView.list_display = ('parent.test_text',)
+        Child = ChildView.Form.Meta.model
+        child = Child()
+        child.parent = self.Model(test_text='Parent')
+        self.session.add_all([child, Child()])
+        self.session.flush()
+        view = ChildView(self.request)
+        [head] = view.iter_head_cols()
+        assert head['label'] == 'Test Text'
+        assert head['css_class'] == 'column-parent-test_text'
+        values = [list(view.iter_list_cols(item))
+                  for item in view.list()['items']]
+        assert values == [[('parent.test_text', 'Parent')],
+                          [('parent.test_text', None)]]
+
+    def test_list_display_path_not_relationship(self, ChildView):
+        ChildView.list_display = ('parent_id.real',)
+        with pytest.raises(AttributeError):
+            list(ChildView(self.request).iter_head_cols())
+
+    def test_list_display_path_collection(self, ChildForm):
+        self.View.list_display = ('children.id',)
+        with pytest.raises(ValueError):
+            list(self.view.iter_head_cols())
+
+    def test_list_eager_loads_path(self, ChildView):
+        ChildView.list_display = ('id', 'parent.test_text', 'parent')
+        Child = ChildView.Form.Meta.model
+        for index in range(3):
+            child = Child()
+            child.parent = self.Model(test_text='Parent %d' % index)
+            self.session.add(child)
+        self.session.flush()
+        self.session.expunge_all()
+        view = ChildView(self.request)
+        assert len(view._get_list_eager_loads()) == 1
+
+        def render():
+            for item in view.list()['items']:
+                list(view.iter_list_cols(item))
+        assert self.count_statements(render) == 1
+
+    def test_list_eager_loads_collection(self, ChildForm):
+        self.View.list_display = ('id', 'children')
+        Child = ChildForm.Meta.model
+        for index in range(3):
+            parent = self.Model()
+            parent.children.extend([Child(), Child()])
+            self.session.add(parent)
+        self.session.flush()
+        self.session.expunge_all()
+
+        def render():
+            for item in self.view.list()['items']:
+                list(self.view.iter_list_cols(item))
+        assert self.count_statements(render) == 2
+
+    def test_list_load_columns_path(self, ChildView):
+        ChildView.list_display = ('parent.test_text',)
+        view = ChildView(self.request)
+        assert view._get_list_load_columns() == ['id', 'parent_id']
+
+    def test_list_readonly(self):
+        def text_length(obj):
+            pass
+        text_length.info = {'expression': func.length(self.Model.test_text)}
+
+        def upper(obj):
+            return obj.test_text.upper()
+        self.View.list_display = ('id', 'test_text', text_length, upper)
+        self.View.list_readonly = True
+        for text in ['a', 'abc']:
+            self.session.add(self.Model(test_text=text))
+        self.session.flush()
+        self.session.expunge_all()
+        rows = []
+
+        def render():
+            for item in self.view.list()['items']:
+                rows.append(list(self.view.iter_list_cols(item)))
+        assert self.count_statements(render) == 1
+        assert rows == [
+            [('id', 1), ('test_text', 'a'), ('text_length', 1),
+             ('upper', 'A')],
+            [('id', 2), ('test_text', 'abc'), ('text_length', 3),
+             ('upper', 'ABC')],
+        ]
+        assert len(self.session.identity_map) == 0
+        assert not isinstance(self.view.list()['items'][0], self.Model)
+
+    @pytest.mark.usefixtures("route_setup")
+    def test_list_readonly_edit_route(self, obj):
+        self.View.list_display = ('test_text',)
+        self.View.list_readonly = True
+        [item] = self.view.list()['items']
+        assert (self.view._edit_route(item) ==
+                'http://example.com/test/%d/edit' % obj.id)
+        assert self.view._get_item_choices() == [(str(obj.id), '')]
+
+    def test_list_readonly_path(self, ChildView):
+        ChildView.list_display = ('id', 'parent.test_text')
+        ChildView.list_readonly = True
+        Child = ChildView.Form.Meta.model
+        child = Child()
+        child.parent = self.Model(test_text='Parent')
+        self.session.add_all([child, Child()])
+        self.session.flush()
+        view = ChildView(self.request)
+        values = [list(view.iter_list_cols(item))
+                  for item in view.list()['items']]
+        assert values == [[('id', 1), ('parent.test_text', 'Parent')],
+                          [('id', 2), ('parent.test_text', None)]]
+
+    def test_list_readonly_load_columns(self):
+        def text(obj):
+            return obj.test_text
+        self.View.list_display = (text,)
+        self.View.list_load_columns = ('test_text',)
+        self.View.list_readonly = True
+        self.session.add(self.Model(test_text='foo'))
+        self.session.flush()
+        [item] = self.view.list()['items']
+        assert list(self.view.iter_list_cols(item)) == [('text', 'foo')]
+
+    @pytest.mark.parametrize('list_display', [
+        ('__str__',),
+        ('children',),
+    ])
+    def test_list_readonly_invalid(self, ChildForm, list_display):
+        self.View.list_display = list_display
+        self.View.list_readonly = True
+        with pytest.raises(ValueError):
+            self.view.get_list_query()
+
+    def test_list_readonly_keyset(self):
+        def text_length(obj):
+            pass
+        text_length.info = {'expression': func.length(self.Model.test_text)}
+        self.View.list_display = ('id', text_length)
+        self.View.list_readonly = True
+        self.View.list_pagination = 'keyset'
+        self.View.list_per_page = 1
+        for text in ['abc', 'a']:
+            self.session.add(self.Model(test_text=text))
+        self.session.flush()
+        self.request.GET['order'] = 'text_length'
+        page = self.view.list()['page']
+        assert [item.id for item in page.items] == [2]
+        self.request.GET['cursor'] = page.next_params['cursor']
+        view = self.View(self.request)
+        [item] = view.list()['items']
+        assert list(view.iter_list_cols(item)) == [
+            ('id', 1), ('text_length', 3)]
+
+    def test_export_readonly(self):
+        def text_length(obj):
+            pass
+        text_length.info = {'expression': func.length(self.Model.test_text)}
+        self.View.list_display = ('id', text_length)
+        self.View.list_readonly = True
+        self.session.add(self.Model(test_text='abc'))
+        self.session.flush()
+        _, body = self.export('ndjson')
+        assert body == b'{"id": 1, "text_length": 3}\n'
+
+    def test_list_export_default(self):
+        assert CRUDView.list_export == ()
+
+    def test_list_per_page_default(self):
+        assert self.View.list_per_page == 100
+
+    def test_list_paginated(self):
+        self.session.add_all([self.Model() for _ in range(5)])
+        self.session.flush()
+        self.View.list_per_page = 2
+        self.request.GET['page'] = '2'
+        data = self.view.list()
+        assert [item.id for item in data['items']] == [3, 4]
+        page = data['page']
+        assert page.page == 2
+        assert page.page_count == 3
+        choices = data['action_form'].items.choices
+        assert choices == [('3', ''), ('4', '')]
+
+    def test_list_count_default(self):
+        assert isinstance(self.View.list_count, ExactCount)
+
+    def test_list_count(self):
+        self.session.add_all([self.Model() for _ in range(5)])
+        self.session.flush()
+        self.View.list_per_page = 2
+        self.View.list_count = CachedCount()
+        page = self.view.list()['page']
+        assert page.item_count == 5
+        assert page.item_count_exact
+        self.session.add(self.Model())
+        self.session.flush()
+        view = self.View(self.request)
+        assert view.list()['page'].item_count == 5
+
+    def test_list_ordered_by_pk(self):
+        self.session.add_all([self.Model(id=3), self.Model(id=1),
+                              self.Model(id=2)])
+        self.session.flush()
+        data = self.view.list()
+        assert [item.id for item in data['items']] == [1, 2, 3]
+
+    def test_list_unpaginated(self, obj):
+        self.View.list_per_page = None
+        data = self.view.list()
+        assert list(data['items']) == [obj]
+        assert data['page'].page_count == 1
+
+    def test_list_keyset(self):
+        self.session.add_all([self.Model() for _ in range(5)])
+        self.session.flush()
+        self.View.list_per_page = 2
+        self.View.list_pagination = 'keyset'
+        data = self.view.list()
+        assert [item.id for item in data['items']] == [1, 2]
+        cursor = data['page'].next_params['cursor']
+        self.request.GET['cursor'] = cursor
+        data = self.View(self.request).list()
+        assert [item.id for item in data['items']] == [3, 4]
+        choices = data['action_form'].items.choices
+        assert choices == [('3', ''), ('4', '')]
+
+    def test_list_invalid_pagination(self):
+        self.View.list_pagination = 'foo'
+        with pytest.raises(ValueError):
+            self.view.list()
+
+    def test_list_filter_default(self):
+        assert self.View.list_filter == ()
+        assert self.view._list_filters == ()
+
+    def test_list_filter(self):
+        self.View.list_filter = ('test_bool', 'test_text')
+        for flag, text in [(True, 'a'), (False, 'a'), (True, 'b')]:
+            self.session.add(self.Model(test_bool=flag, test_text=text))
+        self.session.flush()
+        self.request.GET['test_bool'] = '1'
+        data = self.view.list()
+        assert [item.id for item in data['items']] == [1, 3]
+        assert data['page'].item_count == 2
+        self.request.GET['test_text'] = 'a'
+        view = self.View(self.request)
+        assert [item.id for item in view.list()['items']] == [1]
+
+    def test_list_filter_instance(self):
+        filter_ = ChoiceFilter('test_text', choices=[('a', 'A')])
+        self.View.list_filter = ('test_bool', filter_)
+        filters = self.View._compile_list_filter(self.View.list_filter)
+        assert isinstance(filters[0], BooleanFilter)
+        assert filters[1] is filter_
+        assert self.View._compile_list_filter(('test_bool', filter_)) \
+            is filters
+
+    def test_list_filter_invalid(self):
+        with pytest.raises(AttributeError):
+            self.View._compile_list_filter(('missing',))
+
+    def test_iter_list_filters(self):
+        self.View.list_filter = ('test_bool',)
+        self.request.GET['test_bool'] = '0'
+        [(filter_, label, values, options)] = self.view.iter_list_filters()
+        assert isinstance(filter_, BooleanFilter)
+        assert label == 'Test Bool'
+        assert values == ['0']
+        assert options == [('1', 'Yes', None), ('0', 'No', None)]
+
+    def test_list_facets(self):
+        self.View.list_filter = ('test_bool', 'test_text')
+        self.View.list_facets = True
+        for flag, text in [(True, 'a'), (False, 'a'), (True, 'b'),
+                           (True, 'b')]:
+            self.session.add(self.Model(test_bool=flag, test_text=text))
+        self.session.flush()
+        self.request.GET['test_text'] = 'b'
+        filters = list(self.view.iter_list_filters())
+        assert filters[0][3] == [('1', 'Yes', 2), ('0', 'No', 0)]
+        assert filters[1][3] == [('a', 'a', 0), ('b', 'b', 2)]
+
+    def test_list_facets_single_query(self):
+        self.View.list_filter = ('test_bool',)
+        [filter_] = self.view._list_filters
+        assert self.count_statements(
+            lambda: self.view._get_facet_counts(filter_)) == 1
+
+    def test_list_facets_cached(self):
+        self.View.list_filter = ('test_bool',)
+        self.View.list_facets_cache_ttl = 60
+        self.session.add(self.Model(test_bool=True))
+        self.session.flush()
+        [filter_] = self.view._list_filters
+        assert self.view._get_facet_counts(filter_) == {'1': 1}
+        self.session.add(self.Model(test_bool=True))
+        self.session.flush()
+        view = self.View(self.request)
+        assert self.count_statements(
+            lambda: view._get_facet_counts(filter_)) == 0
+        assert view._get_facet_counts(filter_) == {'1': 1}
+        self.request.GET['test_bool'] = '1'
+        view = self.View(self.request)
+        assert view._get_facet_counts(filter_) == {'1': 2}
+
+    def test_list_facets_not_cached(self):
+        self.View.list_filter = ('test_bool',)
+        self.session.add(self.Model(test_bool=True))
+        self.session.flush()
+        [filter_] = self.view._list_filters
+        assert self.view._get_facet_counts(filter_) == {'1': 1}
+        self.session.add(self.Model(test_bool=True))
+        self.session.flush()
+        assert self.view._get_facet_counts(filter_) == {'1': 2}
+
+    def test_search_default(self):
+        assert self.View.search_fields == ()
+        assert isinstance(self.View.search_backend, LikeSearch)
+
+    def test_list_search(self):
+        self.View.search_fields = ('test_text',)
+        for text in ['foo', 'bar', 'foobar']:
+            self.session.add(self.Model(test_text=text))
+        self.session.flush()
+        self.request.GET['q'] = ' foo '
+        data = self.view.list()
+        assert [item.id for item in data['items']] == [1, 3]
+        assert data['page'].item_count == 2
+
+    def test_list_search_disabled(self, obj):
+        self.request.GET['q'] = 'missing'
+        assert len(self.view.list()['items']) == 1
+
+    def test_search_backend_setup(self):
+        backend = MagicMock()
+        View = type('SearchView', (self.View,), {
+            'Form': self.Form,
+            'url_path': '/search',
+            'search_fields': ('test_text',),
+            'search_backend': backend,
+        })
+        backend.setup.assert_called_once_with(self.Model, ('test_text',))
+        self.request.GET['q'] = 'foo'
+        query = MagicMock()
+        assert View(self.request)._apply_list_search(query) is \
+            backend.apply.return_value
+        backend.apply.assert_called_once_with(query, self.Model,
+                                              ('test_text',), 'foo')
+
+    def test_list_order_default(self):
+        keys = self.view._get_list_order()
+        assert [(key.expression, key.descending) for key in keys] == [
+            (self.Model.id, False)]
+
+    def test_list_order_params(self):
+        self.View.list_display = ('id', 'test_text', 'test_bool', '__str__')
+        self.request.GET['order'] = '-test_text,__str__,foo,test_bool,' \
+                                    'test_text,-test_bool'
+        assert self.view._list_order_params == [('test_text', True),
+                                                ('test_bool', False)]
+
+    def test_list_order_pk_tiebreak(self):
+        self.View.list_display = ('id', 'test_text')
+        self.request.GET['order'] = '-test_text'
+        keys = self.view._get_list_order()
+        assert [(key.expression, key.descending) for key in keys] == [
+            (self.Model.test_text, True), (self.Model.id, True)]
+
+    def test_list_order_pk_requested(self):
+        self.View.list_display = ('id', 'test_text')
+        self.request.GET['order'] = 'id,-test_text'
+        keys = self.view._get_list_order()
+        assert [(key.expression, key.descending) for key in keys] == [
+            (self.Model.id, False), (self.Model.test_text, True)]
+
+    @pytest.mark.parametrize('order, first, second', [
+        ('-test_text', [4, 2], [1, 3]),
+        ('test_bool', [2, 4], [1, 3]),
+        ('-test_bool,test_text', [3, 1], [2, 4]),
+    ])
+    @pytest.mark.parametrize('pagination', ['offset', 'keyset'])
+    def test_list_sorted(self, pagination, order, first, second):
+        self.View.list_display = ('id', 'test_text', 'test_bool')
+        self.View.list_pagination = pagination
+        self.View.list_per_page = 2
+        for text, flag in [('b', True), ('c', False), ('a', True),
+                           ('c', False)]:
+            self.session.add(self.Model(test_text=text, test_bool=flag))
+        self.session.flush()
+        self.request.GET['order'] = order
+        data = self.view.list()
+        assert [item.id for item in data['items']] == first
+        if pagination == 'offset':
+            self.request.GET['page'] = '2'
+        else:
+            self.request.GET.update(data['page'].next_params)
+        view = self.View(self.request)
+        assert [item.id for item in view.list()['items']] == second
+
+    @pytest.mark.parametrize('pagination', ['offset', 'keyset'])
+    def test_list_sorted_expression(self, ChildForm, pagination):
+        self.View.list_display = ('id', RelationshipCount('children'))
+        self.View.list_pagination = pagination
+        self.View.list_per_page = 2
+        Child = ChildForm.Meta.model
+        for count in [1, 3, 0]:
+            parent = self.Model()
+            parent.children.extend([Child() for _ in range(count)])
+            self.session.add(parent)
+        self.session.flush()
+        self.request.GET['order'] = '-children_count'
+        data = self.view.list()
+        assert [item.id for item in data['items']] == [2, 1]
+        if pagination == 'offset':
+            self.request.GET['page'] = '2'
+        else:
+            self.request.GET.update(data['page'].next_params)
+        view = self.View(self.request)
+        assert [item.id for item in view.list()['items']] == [3]
+
+    @pytest.mark.usefixtures("route_setup")
+    def test__get_column_order(self):
+        self.View.list_display = ('id', 'test_text', '__str__')
+        self.request.GET['order'] = 'test_text'
+        self.request.GET['page'] = '3'
+        assert self.view._get_column_order(0) == (
+            'http://example.com/test?order=id', None)
+        assert self.view._get_column_order(1) == (
+            'http://example.com/test?order=-test_text', 'asc')
+        assert self.view._get_column_order(2) is None
+
+    @pytest.mark.parametrize("value, expected", [
+        (None, 1), ('3', 3), ('0', 1), ('-2', 1), ('foo', 1)])
+    def test__get_page_number(self, value, expected):
+        if value is not None:
+            self.request.GET['page'] = value
+        assert self.view._get_page_number() == expected
+
+    @pytest.mark.usefixtures("route_setup")
+    def test__list_route(self):
+        self.request.GET['page'] = '2'
+        self.request.GET['foo'] = 'bar'
+        assert (self.view._list_route(page=3) ==
+                'http://example.com/test?foo=bar&page=3')
+        assert (self.view._list_route(page=None) ==
+                'http://example.com/test?foo=bar')
+
+    @pytest.mark.usefixtures("route_setup")
+    def test__export_route(self):
+        self.request.GET['page'] = '2'
+        self.request.GET['cursor'] = 'abc'
+        self.request.GET['order'] = '-id'
+        assert (self.view._export_route('csv') ==
+                'http://example.com/test/export.csv?order=-id')
+
+    def export(self, format_):
+        self.request.matchdict['format'] = format_
+        response = self.View(self.request).export()
+        return response, b''.join(response.app_iter)
+
+    def test_export_csv(self):
+        self.View.list_display = ('id', 'test_text', 'test_bool')
+        self.session.add(self.Model(test_text=u'caf\xe9, "ol\xe9"',
+                                    test_bool=True))
+        self.session.add(self.Model())
+        self.session.flush()
+        response, body = self.export('csv')
+        assert response.content_type == 'text/csv'
+        assert response.charset == 'utf-8'
+        assert (response.content_disposition ==
+                'attachment; filename="model.csv"')
+        assert body.decode('utf-8').split('\r\n') == [
+            'ID,Test Text,Test Bool',
+            u'1,"caf\xe9, ""ol\xe9""",True',
+            '2,,',
+            '',
+        ]
+
+    def test_export_ndjson(self):
+        def text_length(obj):
+            pass
+        text_length.info = {'expression': func.length(self.Model.test_text)}
+        self.View.list_display = ('id', text_length, 'test_text')
+        self.session.add(self.Model(test_text='abc'))
+        self.session.add(self.Model())
+        self.session.flush()
+        response, body = self.export('ndjson')
+        assert response.content_type == 'application/x-ndjson'
+        lines = body.decode('utf-8').splitlines()
+        assert lines == [
+            '{"id": 1, "text_length": 3, "test_text": "abc"}',
+            '{"id": 2, "text_length": null, "test_text": null}',
+        ]
+
+    def test_export_filtered(self):
+        self.View.list_display = ('id',)
+        self.View.list_filter = ('test_bool',)
+        for value in [True, False, True]:
+            self.session.add(self.Model(test_bool=value))
+        self.session.flush()
+        self.request.GET['test_bool'] = '1'
+        self.request.GET['order'] = '-id'
+        self.request.GET['page'] = '2'
+        _, body = self.export('csv')
+        assert body.split(b'\r\n') == [b'ID', b'3', b'1', b'']
+
+    def test_export_batches(self):
+        calls = []
+
+        def batch(items):
+            calls.append([item.id for item in items])
+            return dict((item.id, item.id * 10) for item in items)
+        batch.info = {'batch': True}
+        self.View.list_display = ('id', batch)
+        self.View.list_export_batch_size = 2
+        self.session.add_all([self.Model() for _ in range(5)])
+        self.session.flush()
+        _, body = self.export('ndjson')
+        assert calls == [[1, 2], [3, 4], [5]]
+        assert len(body.splitlines()) == 5
+        assert b'{"id": 5, "batch": 50}' in body
+
+    def test_export_expunges(self):
+        self.View.list_display = ('id',)
+        self.View.list_export_batch_size = 2
+        self.session.add_all([self.Model() for _ in range(5)])
+        self.session.flush()
+        self.session.expunge_all()
+        self.request.matchdict['format'] = 'csv'
+        sizes = []
+        for _ in self.view.export().app_iter:
+            sizes.append(len(self.session.identity_map))
+        # Header, three batches and nothing left after the last one
+        assert sizes == [0, 2, 2, 1]
+        assert len(self.session.identity_map) == 0
+
+    def test_export_streamed(self, obj):
+        self.request.matchdict['format'] = 'csv'
+        response = self.view.export()
+        body = iter(response.app_iter)
+        assert self.count_statements(lambda: next(body)) == 0
+        assert self.count_statements(lambda: list(body)) == 1
+
+    @pytest.mark.parametrize('header, expected', [
+        ('gzip, deflate', 'gzip'),
+        ('deflate, gzip;q=0', None),
+        ('', None),
+    ])
+    def test_export_accept_encoding(self, obj, header, expected):
+        self.View.list_display = ('id',)
+        self.request.headers['Accept-Encoding'] = header
+        response, body = self.export('csv')
+        assert response.content_encoding == expected
+        assert response.content_type == 'text/csv'
+        assert response.vary == ('Accept-Encoding',)
+        if expected:
+            body = gzip.GzipFile(fileobj=io.BytesIO(body)).read()
+        assert body == b'ID\r\n1\r\n'
+
+    def test_export_compress_file(self, obj):
+        self.View.list_display = ('id',)
+        self.request.headers['Accept-Encoding'] = 'gzip'
+        self.request.GET['compress'] = '1'
+        response, body = self.export('ndjson')
+        assert response.content_encoding is None
+        assert response.content_type == 'application/gzip'
+        assert (response.content_disposition ==
+                'attachment; filename="model.ndjson.gz"')
+        body = gzip.GzipFile(fileobj=io.BytesIO(body)).read()
+        assert body == b'{"id": 1}\n'
+
+    def test_export_compress_disabled(self, obj):
+        self.View.list_export_compress = False
+        self.request.headers['Accept-Encoding'] = 'gzip'
+        self.request.GET['compress'] = '1'
+        response, body = self.export('csv')
+        assert response.content_encoding is None
+        assert response.content_type == 'text/csv'
+        assert not response.vary
+        assert body == b'Model\r\nModelStr\r\n'
+
+    def test_export_compress_streamed(self):
+        self.View.list_display = ('id',)
+        self.View.list_export_batch_size = 10
+        self.View.list_export_buffer_size = 100
+        self.session.add_all([self.Model() for _ in range(100)])
+        self.session.flush()
+        self.request.GET['compress'] = '1'
+        self.request.matchdict['format'] = 'csv'
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = [decompressor.decompress(chunk)
+                  for chunk in self.View(self.request).export().app_iter]
+        # The header is sent right away and each flush is bounded
+        assert chunks[0] == b'ID\r\n'
+        assert len(chunks) > 3
+        assert all(len(chunk) < 200 for chunk in chunks)
+        assert b''.join(chunks).count(b'\r\n') == 101
+
+    @pytest.mark.parametrize('format_, list_export', [
+        ('xml', ('csv', 'ndjson')),
+        ('csv', ()),
+        ('json', ('json',)),
+    ])
+    def test_export_invalid_format(self, format_, list_export):
+        self.View.list_export = list_export
+        self.request.matchdict['format'] = format_
+        with pytest.raises(HTTPNotFound):
+            self.view.export()
+
     @pytest.mark.usefixtures("route_setup", "csrf_token")
     def test_delete_multiple(self, obj):
         obj2 = self.Model()
@@ -411,6 +1336,128 @@ class TestCRUDView(object):
         flash = self.request.session.flash
         flash.assert_called_once_with('2 Models deleted!')
 
+    @pytest.mark.usefixtures("route_setup", "csrf_token")
+    def test_delete_confirm_batches(self):
+        self.session.add_all([self.Model() for _ in range(5)])
+        self.session.flush()
+        self.View.delete_batch_size = 2
+        self.request.method = 'POST'
+        self.request.POST['action'] = 'delete'
+        self.request.POST['confirm_delete'] = 'something'
+        for id_ in range(1, 6):
+            self.request.POST.add('items', str(id_))
+        flushes = []
+        event.listen(self.session, 'after_flush',
+                     lambda session, context: flushes.append(1))
+        self.session.expunge_all()
+        loaded = []
+        event.listen(self.Model, 'load',
+                     lambda target, context: loaded.append(target))
+        redirect = self.view.list()
+        assert isinstance(redirect, HTTPFound)
+        assert len(flushes) == 3
+        # The deleted instances are not kept by the session
+        assert len(loaded) == 5
+        assert all(inspect(item).detached for item in loaded)
+        assert not list(self.session)
+        assert self.session.query(self.Model).count() == 0
+        flash = self.request.session.flash
+        flash.assert_called_once_with('5 Models deleted!')
+
+    @pytest.mark.parametrize('bulk', [True, False])
+    @pytest.mark.usefixtures("route_setup", "csrf_token")
+    def test_delete_confirm_bulk(self, bulk):
+        self.session.add_all([self.Model() for _ in range(5)])
+        self.session.flush()
+        self.View.delete_bulk = True
+        self.request.method = 'POST'
+        self.request.POST['action'] = 'delete'
+        self.request.POST['confirm_delete'] = 'something'
+        for id_ in range(1, 6):
+            self.request.POST.add('items', str(id_))
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if statement.startswith('DELETE'):
+                statements.append(statement)
+        engine = self.session.get_bind()
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            with patch('pyramid_crud.views.can_bulk_delete',
+                       return_value=bulk):
+                with patch.object(self.view.dbsession, 'delete',
+                                  wraps=self.view.dbsession.delete) as mock:
+                    redirect = self.view.list()
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        assert isinstance(redirect, HTTPFound)
+        assert len(statements) == 1
+        assert mock.call_count == (0 if bulk else 5)
+        assert self.session.query(self.Model).count() == 0
+        flash = self.request.session.flash
+        flash.assert_called_once_with('5 Models deleted!')
+
+    def _confirm_delete(self, count):
+        self.session.add_all([self.Model() for _ in range(count)])
+        self.session.flush()
+        self.request.method = 'POST'
+        self.request.POST['action'] = 'delete'
+        self.request.POST['confirm_delete'] = 'something'
+        for id_ in range(1, count + 1):
+            self.request.POST.add('items', str(id_))
+
+    @pytest.mark.parametrize('bulk', [True, False])
+    @pytest.mark.usefixtures("route_setup", "csrf_token")
+    def test_delete_savepoints(self, bulk):
+        self._confirm_delete(5)
+        self.View.delete_batch_size = 2
+        self.View.delete_savepoints = True
+        self.View.delete_bulk = bulk
+        with patch.object(self.View, 'delete_progress') as progress:
+            redirect = self.view.list()
+        assert isinstance(redirect, HTTPFound)
+        assert progress.call_args_list == [((2, 5),), ((4, 5),), ((5, 5),)]
+        assert self.session.query(self.Model).count() == 0
+        flash = self.request.session.flash
+        flash.assert_called_once_with('5 Models deleted!')
+
+    @pytest.mark.usefixtures("route_setup", "csrf_token")
+    def test_delete_savepoints_partial(self):
+        self._confirm_delete(5)
+        self.View.delete_batch_size = 2
+        self.View.delete_savepoints = True
+        delete_batch_items = self.View._delete_batch_items
+        calls = []
+
+        def fail_second(view, query, bulk):
+            calls.append(1)
+            count = delete_batch_items(view, query, bulk)
+            if len(calls) == 2:
+                raise Exception
+            return count
+        with patch.object(self.View, '_delete_batch_items', fail_second):
+            redirect = self.view.list()
+        assert isinstance(redirect, HTTPFound)
+        ids = [id_ for id_, in self.session.query(self.Model.id)]
+        assert sorted(ids) == [3, 4, 5]
+        flash = self.request.session.flash
+        flash.assert_called_once_with(
+            'Only 2 of 5 Models deleted, there was an error deleting the '
+            'remaining item(s)', 'error')
+
+    @pytest.mark.parametrize('savepoints', [True, False])
+    @pytest.mark.usefixtures("route_setup", "csrf_token")
+    def test_delete_fail_first_batch(self, savepoints):
+        self._confirm_delete(3)
+        self.View.delete_savepoints = savepoints
+        with patch.object(self.View, '_delete_batch_items',
+                          side_effect=Exception):
+            with pytest.raises(HTTPFound):
+                self.view.list()
+        flash = self.request.session.flash
+        flash.assert_called_once_with('There was an error deleting the '
+                                      'item(s)', 'error')
+
     @pytest.mark.usefixtures("route_setup", "csrf_token")
     def test_delete_confirm_fail(self, obj):
         self.request.method = 'POST'
@@ -447,6 +1494,86 @@ class TestCRUDView(object):
         flash.assert_called_once_with('You must select at least one item',
                                       'error')
 
+    def test__lookup_items(self, obj):
+        obj2 = self.Model()
+        self.session.add(obj2)
+        self.session.flush()
+        values = [str(obj.id), '99', 'foo', str(obj2.id)]
+        assert self.view._lookup_items(values) == set([str(obj.id),
+                                                       str(obj2.id)])
+
+    def test__lookup_items_empty(self):
+        assert self.view._lookup_items(['foo']) == set()
+
+    @pytest.mark.parametrize('readonly', [True, False])
+    def test__lookup_items_restricted(self, readonly):
+        self.session.add_all([self.Model() for _ in range(3)])
+        self.session.flush()
+        Model = self.Model
+        get_list_query = self.View.get_list_query
+
+        def restricted(view):
+            return get_list_query(view).filter(Model.id != 2)
+        self.View.get_list_query = restricted
+        self.View.list_readonly = readonly
+        self.View.list_display = ('id',)
+        values = ['1', '2', '3']
+        assert self.view._lookup_items(values) == set(['1', '3'])
+
+    def test__lookup_items_eager_loads(self, ChildView):
+        ChildView.list_display = ('parent.test_text',)
+        Child = ChildView.Form.Meta.model
+        self.session.add(Child())
+        self.session.flush()
+        view = ChildView(self.request)
+        assert view._lookup_items(['1', '2']) == set(['1'])
+
+    @pytest.mark.usefixtures("route_setup", "csrf_token")
+    def test_action_item_not_listed(self, obj):
+        self.session.add(self.Model())
+        self.session.flush()
+        Model = self.Model
+        get_list_query = self.View.get_list_query
+
+        def restricted(view):
+            return get_list_query(view).filter(Model.id != obj.id)
+        self.View.get_list_query = restricted
+        self.request.method = 'POST'
+        self.request.POST['action'] = 'delete'
+        self.request.POST['confirm_delete'] = 'something'
+        self.request.POST['items'] = str(obj.id)
+        retparams = self.view.list()
+        assert retparams['action_form'].errors
+        assert self.session.query(self.Model).count() == 2
+
+    @pytest.mark.usefixtures("route_setup", "csrf_token")
+    def test_action_does_not_load_page(self, obj):
+        self.request.method = 'POST'
+        self.request.POST['action'] = 'delete'
+        self.request.POST['confirm_delete'] = 'something'
+        self.request.POST['items'] = str(obj.id)
+        with patch.object(Page, 'items', new_callable=PropertyMock) as mock:
+            self.view.list()
+        assert not mock.called
+
+    @pytest.mark.usefixtures("route_setup", "csrf_token")
+    def test_action_item_on_other_page(self, obj):
+        self.session.add_all([self.Model() for _ in range(3)])
+        self.session.flush()
+        selected = []
+
+        def test_action(query):
+            selected.extend(item.id for item in query)
+            return True, None
+        self.View.list_per_page = 1
+        self.View.actions = [test_action]
+        self.request.method = 'POST'
+        self.request.POST['action'] = 'test_action'
+        self.request.POST['items'] = '3'
+        redirect = self.view.list()
+        assert isinstance(redirect, HTTPFound)
+        assert selected == [3]
+
     @pytest.mark.usefixtures("csrf_token", "route_setup")
     def test_action_wrong_token(self):
         self.request.method = 'POST'
@@ -672,6 +1799,36 @@ class TestCrudCreator(object):
             assert view in config.add_view.call_args_list
         assert View.routes == route_names
 
+    def test_route_setup_export(self):
+        View = self.make_view(Form=self.Form, url_path='/test',
+                              list_export=('csv',))
+        cb = list(View.__venusian_callbacks__.values())[0][0][0]
+        context = MagicMock()
+        cb(context, None, None)
+        config = context.config.with_package()
+        route_name = 'tests.test_views.MyView.export'
+        assert config.add_route.call_count == 4
+        assert ((route_name, '/test/export.{format}'), {}) in \
+            config.add_route.call_args_list
+        assert (((View,), {'attr': 'export', 'route_name': route_name}) in
+                config.add_view.call_args_list)
+        assert View.routes['export'] == route_name
+
+    def test_route_setup_custom_configurator(self):
+        class Configurator(object):
+            def __init__(self, config, view_class):
+                pass
+
+            def configure_list_view(self):
+                return 'list'
+
+            configure_edit_view = configure_new_view = configure_list_view
+        View = self.make_view(Form=self.Form, url_path='/test',
+                              view_configurator_class=Configurator)
+        cb = list(View.__venusian_callbacks__.values())[0][0][0]
+        cb(MagicMock(), None, None)
+        assert sorted(View.routes) == ['edit', 'list', 'new']
+
     def test_disabled_configuration(self):
         view = self.make_view(url_path='/test', Form=self.Form,
                               view_configurator_class=None)
@@ -723,7 +1880,7 @@ class TestViewConfiguratorDefault(object):
         self.view = MyView
         self.conf = ViewConfigurator(self.config, self.view)
 
-    @pytest.mark.parametrize("action", ["list", "new", "edit"])
+    @pytest.mark.parametrize("action", ["list", "new", "edit", "export"])
     def test_get_route_name(self, action):
         expected_name = 'tests.test_views.MyView.%s' % action
         assert self.conf._get_route_name(action) == expected_name